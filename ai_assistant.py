@@ -14,8 +14,12 @@ No external API keys required.  All intelligence is computed from
 the application's own database and curated knowledge graphs.
 """
 
+from collections import namedtuple
 from datetime import datetime, timedelta
-import json, re, math, random
+import json, re, math, random, threading
+
+import numpy as np
+import scipy.sparse as sp
 
 # ──────────────────────────── Knowledge Graphs ────────────────────────────
 
@@ -155,11 +159,183 @@ LEARNING_RESOURCES = {
 }
 
 
+# ──────────────────────────── Connection Index ────────────────────────────
+
+# What suggest_connections needs about a candidate besides the matrix rows.
+_Peer = namedtuple("_Peer", "user_id name is_mentor skills skill_set goal_set")
+
+
+def _term_set(items):
+    return {t.lower().strip() for t in items}
+
+
+class _ConnectionSnapshot:
+    """Immutable matrices handed to readers; writers swap in a new one."""
+
+    __slots__ = ("peers", "skills", "goals", "skill_counts", "goal_counts", "is_mentor", "active", "row_of")
+
+    def __init__(self, peers, skills, goals, skill_counts, goal_counts, is_mentor, active, row_of):
+        self.peers = peers
+        self.skills = skills
+        self.goals = goals
+        self.skill_counts = skill_counts
+        self.goal_counts = goal_counts
+        self.is_mentor = is_mentor
+        self.active = active
+        self.row_of = row_of
+
+
+class ConnectionIndex:
+    """
+    Sparse user×skill and user×goal incidence matrices over one shared
+    vocabulary. Skill overlap, goal overlap and "their skills cover my
+    goals" for one user against everyone are three sparse mat-vec products.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocab = {}
+        self._snapshot = self._empty()
+
+    @staticmethod
+    def _empty():
+        empty = sp.csr_matrix((0, 0), dtype=np.float64)
+        return _ConnectionSnapshot([], empty, empty, np.zeros(0), np.zeros(0),
+                                   np.zeros(0, dtype=bool), np.zeros(0, dtype=bool), {})
+
+    def __len__(self):
+        return int(self._snapshot.active.sum())
+
+    @staticmethod
+    def _peer(user):
+        return _Peer(user.id, user.name, bool(user.is_mentor), user.get_skills_list()[:5],
+                     _term_set(user.get_skills_list()), _term_set(user.get_goals_list()))
+
+    def _columns(self, terms, grow=True):
+        # Caller holds self._lock when grow=True.
+        cols = []
+        for term in terms:
+            col = self._vocab.get(term)
+            if col is None and grow:
+                col = self._vocab[term] = len(self._vocab)
+            if col is not None:
+                cols.append(col)
+        return sorted(cols)
+
+    def _rows(self, term_sets, width):
+        indptr, indices = [0], []
+        for terms in term_sets:
+            indices.extend(self._columns(terms))
+            indptr.append(len(indices))
+        return sp.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(term_sets), width))
+
+    def build(self, users):
+        """Replace the whole index with ``users``."""
+        peers = [self._peer(u) for u in users]
+        with self._lock:
+            self._vocab = {}
+            for peer in peers:
+                self._columns(peer.skill_set | peer.goal_set)
+            width = len(self._vocab)
+            self._snapshot = _ConnectionSnapshot(
+                peers,
+                self._rows([p.skill_set for p in peers], width),
+                self._rows([p.goal_set for p in peers], width),
+                np.array([len(p.skill_set) for p in peers], dtype=np.float64),
+                np.array([len(p.goal_set) for p in peers], dtype=np.float64),
+                np.array([p.is_mentor for p in peers], dtype=bool),
+                np.ones(len(peers), dtype=bool),
+                {p.user_id: row for row, p in enumerate(peers)},
+            )
+
+    def update_user(self, user):
+        """Insert or replace ``user``'s row after a profile change."""
+        peer = self._peer(user)
+        with self._lock:
+            snap = self._snapshot
+            self._columns(peer.skill_set | peer.goal_set)
+            width = len(self._vocab)
+            skill_row = self._rows([peer.skill_set], width)
+            goal_row = self._rows([peer.goal_set], width)
+            skills, goals = self._widen(snap.skills, width), self._widen(snap.goals, width)
+            peers, row_of = list(snap.peers), snap.row_of
+            pos = row_of.get(user.id)
+            if pos is None:
+                pos = len(peers)
+                peers.append(peer)
+                row_of = dict(row_of)
+                row_of[user.id] = pos
+                skills = sp.vstack([skills, skill_row], format="csr")
+                goals = sp.vstack([goals, goal_row], format="csr")
+                arrays = [np.append(arr, arr.dtype.type(0))
+                          for arr in (snap.skill_counts, snap.goal_counts, snap.is_mentor, snap.active)]
+            else:
+                peers[pos] = peer
+                skills = self._replace_row(skills, pos, skill_row)
+                goals = self._replace_row(goals, pos, goal_row)
+                arrays = [arr.copy() for arr in (snap.skill_counts, snap.goal_counts, snap.is_mentor, snap.active)]
+            skill_counts, goal_counts, is_mentor, active = arrays
+            skill_counts[pos], goal_counts[pos] = len(peer.skill_set), len(peer.goal_set)
+            is_mentor[pos], active[pos] = peer.is_mentor, True
+            self._snapshot = _ConnectionSnapshot(peers, skills, goals, skill_counts, goal_counts,
+                                                 is_mentor, active, row_of)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            snap = self._snapshot
+            pos = snap.row_of.get(user_id)
+            if pos is None:
+                return
+            active = snap.active.copy()
+            active[pos] = False
+            self._snapshot = _ConnectionSnapshot(snap.peers, snap.skills, snap.goals, snap.skill_counts,
+                                                 snap.goal_counts, snap.is_mentor, active, snap.row_of)
+
+    @staticmethod
+    def _widen(matrix, width):
+        if matrix.shape[1] == width:
+            return matrix
+        return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], width))
+
+    @staticmethod
+    def _replace_row(matrix, pos, row):
+        start, end = matrix.indptr[pos], matrix.indptr[pos + 1]
+        data = np.concatenate([matrix.data[:start], row.data, matrix.data[end:]])
+        indices = np.concatenate([matrix.indices[:start], row.indices, matrix.indices[end:]])
+        indptr = matrix.indptr.copy()
+        indptr[pos + 1:] += row.nnz - (end - start)
+        return sp.csr_matrix((data, indices, indptr), shape=matrix.shape)
+
+    def overlaps(self, user_skills, user_goals):
+        """
+        Per-row ``(snapshot, skill_inter, goal_inter, goal_skill_match)``
+        counts for a user with the given lower-cased term sets.
+        """
+        # The lock keeps update_user from growing _vocab while it is read here.
+        with self._lock:
+            snap = self._snapshot
+            skill_cols = self._columns(user_skills, grow=False)
+            goal_cols = self._columns(user_goals, grow=False)
+        width = snap.skills.shape[1]
+
+        def query(cols):
+            # Terms added to the vocabulary after this snapshot have no column in it.
+            vec = np.zeros(width)
+            vec[[c for c in cols if c < width]] = 1.0
+            return vec
+
+        s, g = query(skill_cols), query(goal_cols)
+        return snap, snap.skills @ s, snap.goals @ g, snap.skills @ g
+
+
 # ──────────────────────────── AI Engine ────────────────────────────
 
 class SkillSyncAI:
     """Main orchestrator for all AI sub-systems."""
 
+    def __init__(self):
+        self.connection_index = ConnectionIndex()
+
     # ─── Profile Analyzer ───
 
     def analyze_profile(self, user):
@@ -545,69 +721,88 @@ class SkillSyncAI:
 
     # ─── Connection Recommender ───
 
-    def suggest_connections(self, user, all_users, top_n=6):
-        """Find best peer/mentor matches with reasoning."""
-        user_skills = {s.lower().strip() for s in user.get_skills_list()}
-        user_goals = {g.lower().strip() for g in user.get_goals_list()}
+    def suggest_connections(self, user, all_users=None, top_n=6):
+        """Find best peer/mentor matches with reasoning.
 
+        Scores come from the shared in-memory ConnectionIndex, which this
+        never modifies; ``all_users`` only restricts the candidates to
+        those users.
+        """
+        user_skills = _term_set(user.get_skills_list())
+        user_goals = _term_set(user.get_goals_list())
+        snap, skill_inter, goal_inter, goal_skill_match = self.connection_index.overlaps(user_skills, user_goals)
+        if not snap.peers:
+            return []
+
+        # Jaccard similarity for skills
+        skill_union = len(user_skills) + snap.skill_counts - skill_inter
+        skill_sim = skill_inter / np.maximum(skill_union, 1)
+
+        # Goal alignment
+        goal_align = (goal_inter + goal_skill_match * 2) / np.maximum(len(user_goals) + snap.goal_counts, 1)
+
+        # Compute composite score per connection type
+        complementary = snap.skill_counts - skill_inter
+        if user.is_mentor:
+            score = skill_sim * 40 + goal_align * 30 + 15
+        else:
+            score = np.where(
+                snap.is_mentor,
+                skill_sim * 30 + goal_align * 50 + 20,
+                skill_sim * 20 + goal_align * 40 + np.minimum(complementary * 5, 30) + 10,
+            )
+        match_score = np.minimum(np.round(score), 98)
+
+        candidates = np.flatnonzero(snap.active)
+        if all_users is not None:
+            allowed = [snap.row_of[u.id] for u in all_users if u.id in snap.row_of]
+            candidates = np.intersect1d(candidates, np.asarray(allowed, dtype=np.int64))
+        own = snap.row_of.get(user.id)
+        if own is not None:
+            candidates = candidates[candidates != own]
+        best = candidates[np.argsort(-match_score[candidates], kind="stable")[:top_n]]
+
+        # Reasoning strings only for the rows actually returned.
         suggestions = []
-        for other in all_users:
-            if other.id == user.id:
-                continue
-
-            other_skills = {s.lower().strip() for s in other.get_skills_list()}
-            other_goals = {g.lower().strip() for g in other.get_goals_list()}
-
-            # Jaccard similarity for skills
-            skill_union = user_skills.union(other_skills)
-            skill_inter = user_skills.intersection(other_skills)
-            skill_sim = len(skill_inter) / max(len(skill_union), 1)
-
-            # Goal alignment
-            goal_inter = user_goals.intersection(other_goals)
-            goal_skill_match = user_goals.intersection(other_skills)  # their skills match our goals
-            goal_align = (len(goal_inter) + len(goal_skill_match) * 2) / max(len(user_goals) + len(other_goals), 1)
-
-            # Compute composite score
+        for row in best:
+            other = snap.peers[row]
             if other.is_mentor and not user.is_mentor:
                 # Mentor match: prioritize goal coverage
-                score = skill_sim * 30 + goal_align * 50 + 20
                 conn_type = "mentor"
+                covered = user_goals & other.skill_set
+                shared = user_skills & other.skill_set
                 reason_parts = []
-                if goal_skill_match:
-                    reason_parts.append(f"can teach you {', '.join(s.title() for s in list(goal_skill_match)[:3])}")
-                if skill_inter:
-                    reason_parts.append(f"shares knowledge in {', '.join(s.title() for s in list(skill_inter)[:2])}")
+                if covered:
+                    reason_parts.append(f"can teach you {', '.join(s.title() for s in list(covered)[:3])}")
+                if shared:
+                    reason_parts.append(f"shares knowledge in {', '.join(s.title() for s in list(shared)[:2])}")
                 reason = "; ".join(reason_parts) or "Experienced mentor in your area of interest"
             elif not other.is_mentor and not user.is_mentor:
                 # Peer match: prioritize shared goals + complementary skills
-                complementary = other_skills - user_skills
-                score = skill_sim * 20 + goal_align * 40 + min(len(complementary) * 5, 30) + 10
                 conn_type = "study_partner"
+                shared_goals = user_goals & other.goal_set
+                complementary_skills = other.skill_set - user_skills
                 reason_parts = []
-                if goal_inter:
-                    reason_parts.append(f"shares your goal of {', '.join(g.title() for g in list(goal_inter)[:2])}")
-                if complementary:
-                    reason_parts.append(f"can help with {', '.join(s.title() for s in list(complementary)[:2])}")
+                if shared_goals:
+                    reason_parts.append(f"shares your goal of {', '.join(g.title() for g in list(shared_goals)[:2])}")
+                if complementary_skills:
+                    reason_parts.append(f"can help with {', '.join(s.title() for s in list(complementary_skills)[:2])}")
                 reason = "; ".join(reason_parts) or "Fellow learner with aligned interests"
             else:
-                score = skill_sim * 40 + goal_align * 30 + 15
                 conn_type = "peer"
                 reason = "Complementary skill set for collaboration"
 
             suggestions.append({
-                "user_id": other.id,
+                "user_id": other.user_id,
                 "name": other.name,
                 "role": "Mentor" if other.is_mentor else "Learner",
-                "skills": other.get_skills_list()[:5],
+                "skills": other.skills,
                 "connection_type": conn_type,
-                "match_score": min(round(score), 98),
+                "match_score": int(match_score[row]),
                 "reason": reason,
                 "initial": other.name[0] if other.name else "?",
             })
-
-        suggestions.sort(key=lambda x: x["match_score"], reverse=True)
-        return suggestions[:top_n]
+        return suggestions
 
     # ─── Weekly Insights ───
 
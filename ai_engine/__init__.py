@@ -1 +1,3 @@
 from .recommender import SkillMatcher
+from .ann import LSHIndex
+from .bitset import SkillBitsetIndex
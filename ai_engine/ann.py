@@ -0,0 +1,94 @@
+import numpy as np
+
+_MAX_BITS = 24
+
+
+class _LSHTables:
+    """Hash tables for one index snapshot: per table, rows sorted by bucket code."""
+
+    __slots__ = ('n_rows', 'n_bits', 'order', 'codes')
+
+    def __init__(self, n_rows, n_bits, order, codes):
+        self.n_rows = n_rows
+        self.n_bits = n_bits
+        self.order = order      # (n_tables, n_rows) row ids, grouped by bucket
+        self.codes = codes      # (n_tables, n_rows) bucket code of each entry in ``order``
+
+
+class LSHIndex:
+    """Random-projection (SimHash) LSH over the L2-normalised TF-IDF rows.
+
+    Each of ``n_tables`` tables hashes a row to the sign pattern of
+    ``n_bits`` random projections, so rows with a small angle between them
+    tend to share a bucket. A query collects the rows in its own bucket and
+    in the ``probes - 1`` neighbouring buckets reached by flipping its
+    least certain bits, and only those candidates are scored exactly.
+
+    ``probes`` is the recall/latency knob: more probes scan more buckets.
+    ``n_tables`` does the same at build time. ``n_bits`` defaults to about
+    ``bucket_size`` rows per bucket. Below ``min_rows`` the matcher stays
+    exact, since a full scan is already fast.
+    """
+
+    def __init__(self, n_tables=16, n_bits=None, probes=4, bucket_size=256,
+                 min_rows=20000, rebuild_after=2000, seed=0):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probes = probes
+        self.bucket_size = bucket_size
+        self.min_rows = min_rows
+        self.rebuild_after = rebuild_after
+        self.seed = seed
+        self._planes = {}   # dim -> (n_tables * _MAX_BITS, dim) projections
+
+    def _bits_for(self, n_rows):
+        if self.n_bits:
+            return self.n_bits
+        return int(np.clip(np.round(np.log2(max(n_rows, 1) / self.bucket_size)), 1, _MAX_BITS))
+
+    def _projections(self, dim, n_bits):
+        planes = self._planes.get(dim)
+        if planes is None:
+            rng = np.random.default_rng(self.seed)
+            planes = rng.standard_normal((self.n_tables * _MAX_BITS, dim)).astype(np.float32)
+            self._planes[dim] = planes
+        # Table t uses rows [t * _MAX_BITS, t * _MAX_BITS + n_bits) so its planes don't change with n_bits.
+        picks = (np.arange(self.n_tables)[:, None] * _MAX_BITS + np.arange(n_bits)[None, :]).ravel()
+        return planes[picks]
+
+    def _project(self, matrix, n_bits):
+        planes = self._projections(matrix.shape[1], n_bits)
+        proj = np.asarray(matrix @ planes.T)
+        return proj.reshape(matrix.shape[0], self.n_tables, n_bits)
+
+    @staticmethod
+    def _codes(proj):
+        weights = np.left_shift(np.int64(1), np.arange(proj.shape[-1], dtype=np.int64))
+        return ((proj > 0) * weights).sum(axis=-1)
+
+    def build(self, matrix):
+        """Hash every row of CSR ``matrix``; returns the tables for a snapshot."""
+        n_rows = matrix.shape[0]
+        n_bits = self._bits_for(n_rows)
+        codes = self._codes(self._project(matrix, n_bits)).T       # (n_tables, n_rows)
+        order = np.argsort(codes, axis=1, kind='stable')
+        return _LSHTables(n_rows, n_bits, order, np.take_along_axis(codes, order, axis=1))
+
+    def candidates(self, tables, query, probes=None):
+        """Row ids sharing a probed bucket with the (1 × dim) ``query`` in any table."""
+        probes = max(1, self.probes if probes is None else probes)
+        proj = self._project(query, tables.n_bits)[0]               # (n_tables, n_bits)
+        base = self._codes(proj)
+        # Multi-probe: flip the bits whose projections were closest to zero.
+        flips = np.argsort(np.abs(proj), axis=1)[:, :probes - 1]
+        probe_codes = np.concatenate(
+            [base[:, None], base[:, None] ^ np.left_shift(np.int64(1), flips.astype(np.int64))], axis=1)
+
+        found = []
+        for t in range(self.n_tables):
+            lo = np.searchsorted(tables.codes[t], probe_codes[t], side='left')
+            hi = np.searchsorted(tables.codes[t], probe_codes[t], side='right')
+            found.extend(tables.order[t, a:b] for a, b in zip(lo, hi) if b > a)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
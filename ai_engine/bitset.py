@@ -0,0 +1,195 @@
+import threading
+
+import numpy as np
+
+# Bits set in every byte value, for popcount on NumPy versions without bitwise_count.
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount_rows(words):
+    """Number of set bits in each row of a 2-D uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return _POPCOUNT8[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def _terms(text):
+    return {t.strip().lower() for t in (text or '').split(',') if t.strip()}
+
+
+class _BitsetSnapshot:
+    """Immutable (skill_bits, goal_bits) pair handed out to readers.
+
+    Writers build new arrays and swap the reference, like SkillMatcher's
+    _IndexSnapshot, so a reader never sees a row half re-packed.
+    """
+
+    __slots__ = ('skill_bits', 'goal_bits')
+
+    def __init__(self, skill_bits, goal_bits):
+        self.skill_bits = skill_bits
+        self.goal_bits = goal_bits
+
+
+class SkillBitsetIndex:
+    """Persistent packed-bit index of every user's skill and goal terms.
+
+    Each distinct (lower-cased) skill/goal term is interned to a bit
+    position, and each user is stored as one row of uint64 words for skills
+    and one for goals. Overlap between any set of terms and many users is
+    then an AND plus popcount over their rows at once. The search ranking
+    (app._score_candidates) is its consumer.
+
+    The index is built once and kept current by ``update_user`` /
+    ``remove_user``. ``sync`` re-packs only rows whose skills/goals text no
+    longer matches the user objects passed in, so a caller holding fresher
+    rows (another process edited the profile) never scores stale bits.
+    Rows are never reused, so row numbers from ``sync`` stay valid.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self._row_of = {}
+        self._texts = []            # (skills, goals) text each row was packed from
+        self._snapshot = _BitsetSnapshot(np.zeros((0, 1), dtype=np.uint64), np.zeros((0, 1), dtype=np.uint64))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(1 for text in self._texts if text is not None)
+
+    # ─── Maintenance ───
+
+    def _intern(self, terms):
+        for term in terms:
+            if term not in self.vocab:
+                self.vocab[term] = len(self.vocab)
+
+    def _width(self):
+        return max(1, (len(self.vocab) + 63) // 64)
+
+    def _pack(self, terms, width):
+        row = np.zeros(width, dtype=np.uint64)
+        for term in terms:
+            bit = self.vocab.get(term)
+            if bit is not None:
+                row[bit >> 6] |= np.uint64(1) << np.uint64(bit & 63)
+        return row
+
+    def mask(self, terms):
+        """Pack the interned ``terms`` into a single row; terms never seen are ignored."""
+        with self._lock:
+            return self._pack(terms, self._width())
+
+    def mask_where(self, predicate):
+        """Row with the bit of every vocabulary term for which ``predicate(term)`` holds."""
+        with self._lock:
+            return self._pack([term for term in self.vocab if predicate(term)], self._width())
+
+    def build_index(self, users):
+        """Intern every skill/goal and pack all users into bit arrays."""
+        users = list(users)
+        skills = [_terms(u.skills) for u in users]
+        goals = [_terms(u.goals) for u in users]
+        with self._lock:
+            self.vocab = {}
+            for terms in skills + goals:
+                self._intern(terms)
+
+            width = self._width()
+            skill_bits = np.zeros((len(users), width), dtype=np.uint64)
+            goal_bits = np.zeros((len(users), width), dtype=np.uint64)
+            for bits, term_sets in ((skill_bits, skills), (goal_bits, goals)):
+                rows = [r for r, terms in enumerate(term_sets) for _ in terms]
+                ids = np.fromiter((self.vocab[t] for terms in term_sets for t in terms), dtype=np.int64)
+                np.bitwise_or.at(bits, (np.asarray(rows, dtype=np.int64), ids >> 6),
+                                 np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64)))
+            self._row_of = {u.id: row for row, u in enumerate(users)}
+            self._texts = [(u.skills, u.goals) for u in users]
+            self._snapshot = _BitsetSnapshot(skill_bits, goal_bits)
+
+    def _put_many(self, users):
+        """Re-pack ``users`` into fresh copies of the arrays and publish them. Caller holds the lock."""
+        parsed = [(user, _terms(user.skills), _terms(user.goals)) for user in users]
+        for _, skills, goals in parsed:
+            self._intern(skills | goals)
+        width = self._width()
+        snap = self._snapshot
+        new_ids = [user.id for user, _, _ in parsed if user.id not in self._row_of]
+        n_rows = len(self._texts) + len(dict.fromkeys(new_ids))
+
+        arrays = []
+        for bits in (snap.skill_bits, snap.goal_bits):
+            grown = np.zeros((n_rows, width), dtype=np.uint64)
+            grown[:bits.shape[0], :bits.shape[1]] = bits
+            arrays.append(grown)
+        skill_bits, goal_bits = arrays
+
+        for user, skills, goals in parsed:
+            row = self._row_of.get(user.id)
+            if row is None:
+                row = self._row_of[user.id] = len(self._texts)
+                self._texts.append(None)
+            self._texts[row] = (user.skills, user.goals)
+            skill_bits[row] = self._pack(skills, width)
+            goal_bits[row] = self._pack(goals, width)
+        self._snapshot = _BitsetSnapshot(skill_bits, goal_bits)
+
+    def update_user(self, user):
+        """Insert or re-pack a single user after a profile change."""
+        with self._lock:
+            self._put_many([user])
+
+    def remove_user(self, user_id):
+        # The row stays (rows are never reused) but forgets its text, so a later sync re-packs it.
+        with self._lock:
+            row = self._row_of.get(user_id)
+            if row is not None:
+                self._texts[row] = None
+
+    def sync(self, users):
+        """Row of each of ``users``, packing any that are new or whose text changed."""
+        with self._lock:
+            stale = [u for u in users
+                     if u.id not in self._row_of or self._texts[self._row_of[u.id]] != (u.skills, u.goals)]
+            if stale:
+                self._put_many(stale)
+            return np.fromiter((self._row_of[u.id] for u in users), dtype=np.int64, count=len(users))
+
+    # ─── Batch scoring ───
+
+    @staticmethod
+    def _align(mask, width):
+        # Masks and snapshots can differ in width by terms interned in between;
+        # bits past the narrower one are in neither.
+        if len(mask) < width:
+            mask = np.pad(mask, (0, width - len(mask)))
+        return mask[:width]
+
+    @classmethod
+    def _overlap(cls, bits, rows, mask):
+        words = bits[rows]
+        return popcount_rows(words & cls._align(mask, words.shape[1]))
+
+    @classmethod
+    def _hits(cls, bits, rows, masks):
+        words = bits[rows]
+        if not masks:
+            return np.zeros(len(words), dtype=np.int64)
+        stacked = np.stack([cls._align(m, words.shape[1]) for m in masks])
+        return (words[:, None, :] & stacked[None, :, :]).any(axis=2).sum(axis=1)
+
+    def skill_overlap(self, rows, mask):
+        """Skills each of ``rows`` shares with ``mask``."""
+        return self._overlap(self._snapshot.skill_bits, rows, mask)
+
+    def goal_overlap(self, rows, mask):
+        """Goals each of ``rows`` shares with ``mask``."""
+        return self._overlap(self._snapshot.goal_bits, rows, mask)
+
+    def skill_hits(self, rows, masks):
+        """How many of ``masks`` each of ``rows`` shares at least one skill with."""
+        return self._hits(self._snapshot.skill_bits, rows, masks)
+
+    def goal_hits(self, rows, masks):
+        """How many of ``masks`` each of ``rows`` shares at least one goal with."""
+        return self._hits(self._snapshot.goal_bits, rows, masks)
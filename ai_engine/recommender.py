@@ -1,56 +1,354 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import scipy.sparse as sp
+import threading
+import time
+
+
+class _IndexSnapshot:
+    """Immutable view of the TF-IDF index handed out to readers.
+
+    Writers never mutate a snapshot in place; they build a new one and swap
+    the reference, so a request that grabbed a snapshot keeps a consistent
+    (vectorizer, matrix, ids) triple for its whole lifetime.
+    """
+
+    __slots__ = ('vectorizer', 'matrix', 'user_ids', 'is_mentor', 'row_of', 'ann', 'ann_pending')
+
+    def __init__(self, vectorizer, matrix, user_ids, is_mentor, row_of=None, ann=None, ann_pending=None):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.user_ids = user_ids
+        self.is_mentor = is_mentor
+        self.row_of = row_of if row_of is not None else {int(uid): row for row, uid in enumerate(user_ids)}
+        # LSH tables over ``matrix`` (ANN mode only) and the rows edited since they were built.
+        self.ann = ann
+        self.ann_pending = ann_pending if ann_pending is not None else np.zeros(0, dtype=np.int64)
+
+    @property
+    def fitted(self):
+        return self.vectorizer is not None
+
+
+_EMPTY = _IndexSnapshot(None, sp.csr_matrix((0, 0)), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+
 
 class SkillMatcher:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=100)
-    
-    def find_matches(self, current_user, all_users, top_n=5):
-        if len(all_users) == 0:
-            return []
-        
-        user_texts = []
-        user_data = []
-        
-        current_text = self._create_user_text(current_user)
-        
-        for user in all_users:
-            if user.id != current_user.id:
-                if current_user.is_mentor and not user.is_mentor:
-                    user_texts.append(self._create_user_text(user))
-                    user_data.append(user)
-                elif not current_user.is_mentor and user.is_mentor:
-                    user_texts.append(self._create_user_text(user))
-                    user_data.append(user)
-        
-        if len(user_texts) == 0:
+    """TF-IDF matcher backed by a persistent, incrementally updated index.
+
+    The vectorizer is fit once over every profile and the result kept as a
+    CSR matrix with one L2-normalised row per user. Profile edits replace a
+    single row using the fitted vocabulary; once enough rows have drifted the
+    whole index is refit from the cached profile texts.
+
+    Pass an ``ann.LSHIndex`` as ``ann`` to answer single-user queries from
+    LSH candidates instead of a full scan once the index is large enough.
+    """
+
+    def __init__(self, refit_ratio=0.2, ann=None):
+        self.refit_ratio = refit_ratio
+        self.ann = ann
+        self._lock = threading.Lock()
+        self._texts = {}       # user_id -> profile text
+        self._roles = {}       # user_id -> is_mentor
+        self._snapshot = _EMPTY
+        self._updates_since_fit = 0
+
+    def _new_vectorizer(self):
+        return TfidfVectorizer(stop_words='english', max_features=100)
+
+    @property
+    def vectorizer(self):
+        return self._snapshot.vectorizer
+
+    def __len__(self):
+        return len(self._snapshot.user_ids)
+
+    # ─── Index maintenance ───
+
+    def build_index(self, users):
+        """Fit the vectorizer over ``users`` and replace the whole index."""
+        with self._lock:
+            self._texts = {u.id: self._create_user_text(u) for u in users}
+            self._roles = {u.id: bool(u.is_mentor) for u in users}
+            self._refit()
+
+    def update_user(self, user):
+        """Insert or replace ``user``'s row after a profile change."""
+        with self._lock:
+            text = self._create_user_text(user)
+            self._texts[user.id] = text
+            self._roles[user.id] = bool(user.is_mentor)
+
+            snap = self._snapshot
+            if not snap.fitted:
+                self._refit()
+                return
+
+            self._updates_since_fit += 1
+            if self._updates_since_fit > max(1, self.refit_ratio * len(self._texts)):
+                self._refit()
+                return
+
+            row = snap.vectorizer.transform([text]).tocsr()
+            pos = snap.row_of.get(user.id)
+            if pos is None:
+                pos = len(snap.user_ids)
+                matrix = sp.vstack([snap.matrix, row], format='csr')
+                user_ids = np.append(snap.user_ids, user.id)
+                is_mentor = np.append(snap.is_mentor, bool(user.is_mentor))
+                row_of = dict(snap.row_of)
+                row_of[user.id] = pos
+            else:
+                matrix = self._replace_row(snap.matrix, pos, row)
+                user_ids = snap.user_ids
+                is_mentor = snap.is_mentor.copy()
+                is_mentor[pos] = bool(user.is_mentor)
+                row_of = snap.row_of
+            self._snapshot = self._with_ann(
+                _IndexSnapshot(snap.vectorizer, matrix, user_ids, is_mentor, row_of),
+                previous=snap, edited_row=pos)
+
+    def remove_user(self, user_id):
+        """Drop ``user_id`` from the index (e.g. after account deletion)."""
+        with self._lock:
+            self._texts.pop(user_id, None)
+            self._roles.pop(user_id, None)
+            snap = self._snapshot
+            pos = snap.row_of.get(user_id)
+            if pos is None:
+                return
+            keep = np.ones(len(snap.user_ids), dtype=bool)
+            keep[pos] = False
+            # Row positions shift, so any LSH tables are rebuilt.
+            self._snapshot = self._with_ann(_IndexSnapshot(snap.vectorizer, snap.matrix[keep],
+                                                           snap.user_ids[keep], snap.is_mentor[keep]))
+
+    def _refit(self):
+        # Caller holds self._lock.
+        self._updates_since_fit = 0
+        ids = list(self._texts.keys())
+        if not ids:
+            self._snapshot = _EMPTY
+            return
+        vectorizer = self._new_vectorizer()
+        try:
+            matrix = vectorizer.fit_transform([self._texts[i] for i in ids]).tocsr()
+        except ValueError:
+            # Every profile is empty or stop-words only – nothing to index yet.
+            vectorizer = None
+            matrix = sp.csr_matrix((len(ids), 0))
+        self._snapshot = self._with_ann(_IndexSnapshot(
+            vectorizer,
+            matrix,
+            np.asarray(ids, dtype=np.int64),
+            np.asarray([self._roles[i] for i in ids], dtype=bool),
+        ))
+
+    def _with_ann(self, snap, previous=None, edited_row=None):
+        """Attach LSH tables to ``snap`` when ANN mode applies.
+
+        After a single-row edit the previous tables are reused and the row
+        is remembered as pending (always scored exactly) until enough rows
+        have changed to justify re-hashing.
+        """
+        # Caller holds self._lock.
+        if self.ann is None or not snap.fitted or len(snap.user_ids) < self.ann.min_rows:
+            return snap
+        if previous is not None and previous.ann is not None and edited_row is not None:
+            pending = np.union1d(previous.ann_pending, [edited_row])
+            if len(pending) <= self.ann.rebuild_after:
+                snap.ann, snap.ann_pending = previous.ann, pending
+                return snap
+        snap.ann = self.ann.build(snap.matrix)
+        return snap
+
+    @staticmethod
+    def _replace_row(matrix, pos, row):
+        """Return a copy of CSR ``matrix`` with row ``pos`` swapped for ``row``."""
+        start, end = matrix.indptr[pos], matrix.indptr[pos + 1]
+        delta = row.nnz - (end - start)
+        data = np.concatenate([matrix.data[:start], row.data, matrix.data[end:]])
+        indices = np.concatenate([matrix.indices[:start], row.indices, matrix.indices[end:]])
+        indptr = matrix.indptr.copy()
+        indptr[pos + 1:] += delta
+        return sp.csr_matrix((data, indices, indptr), shape=matrix.shape)
+
+    # ─── Queries ───
+
+    def _query_vector(self, current_user, snap):
+        pos = snap.row_of.get(current_user.id)
+        if pos is not None:
+            return snap.matrix[pos]
+        return snap.vectorizer.transform([self._create_user_text(current_user)])
+
+    def similarities(self, current_user, snapshot=None):
+        """Cosine similarity of ``current_user`` against every indexed row."""
+        snap = snapshot or self._snapshot
+        query = self._query_vector(current_user, snap)
+        # Rows are L2-normalised, so the dot product is the cosine similarity.
+        return np.asarray((snap.matrix @ query.T).todense()).ravel()
+
+    def candidate_scores(self, current_user, candidate_ids=None, exact=False, probes=None):
+        """Return ``(user_ids, similarities)`` over every opposite-role user.
+
+        In ANN mode (and unless ``exact`` or ``candidate_ids`` is given) only
+        the users sharing an LSH bucket with ``current_user`` are returned.
+        """
+        snap = self._snapshot
+        if not snap.fitted or len(snap.user_ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        if snap.ann is not None and not exact and candidate_ids is None:
+            query = self._query_vector(current_user, snap)
+            rows = np.union1d(self.ann.candidates(snap.ann, query, probes), snap.ann_pending)
+            rows = rows[(snap.is_mentor[rows] != bool(current_user.is_mentor)) &
+                        (snap.user_ids[rows] != current_user.id)]
+            if len(rows) == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+            sims = np.asarray((snap.matrix[rows] @ query.T).todense()).ravel()
+            return snap.user_ids[rows], sims
+
+        mask = snap.is_mentor != bool(current_user.is_mentor)
+        mask &= snap.user_ids != current_user.id
+        if candidate_ids is not None:
+            mask &= np.isin(snap.user_ids, np.fromiter(candidate_ids, dtype=np.int64))
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return snap.user_ids[candidates], self.similarities(current_user, snap)[candidates]
+
+    def top_matches(self, current_user, top_n=5, candidate_ids=None, exact=False, probes=None):
+        """Return ``[(user_id, similarity), ...]`` for the best opposite-role users."""
+        user_ids, sims = self.candidate_scores(current_user, candidate_ids, exact, probes)
+        if len(user_ids) == 0:
             return []
-        
-        all_texts = [current_text] + user_texts
-        
+        k = min(top_n, len(user_ids))
+        best = np.argpartition(-sims, k - 1)[:k]
+        best = best[np.argsort(-sims[best], kind='stable')]
+        return [(int(user_ids[i]), float(sims[i])) for i in best]
+
+    def iter_top_matches(self, top_n=5, block_size=128):
+        """Yield ``(user_id, [(match_id, similarity), ...])`` for every indexed user.
+
+        Scores ``block_size`` users per sparse mat-mat product so a full
+        recompute costs ``n / block_size`` products instead of ``n`` mat-vecs.
+        """
+        snap = self._snapshot
+        n = len(snap.user_ids)
+        if not snap.fitted or n == 0:
+            return
+        matrix_t = snap.matrix.T.tocsc()
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n))
+            sims = np.asarray((snap.matrix[rows] @ matrix_t).todense())
+            allowed = snap.is_mentor[None, :] != snap.is_mentor[rows][:, None]
+            sims[~allowed] = -np.inf
+            k = min(top_n, n)
+            best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            for offset, row in enumerate(rows):
+                cols = best[offset]
+                cols = cols[np.argsort(-sims[offset, cols], kind='stable')]
+                yield int(snap.user_ids[row]), [
+                    (int(snap.user_ids[c]), float(sims[offset, c]))
+                    for c in cols if np.isfinite(sims[offset, c])
+                ]
+
+    def rescore_lists(self, lists, top_n=5):
+        """Re-rank stored match lists against one snapshot.
+
+        ``lists`` maps a user id to the candidate ids of their list. Every
+        pair is scored from the same (vectorizer, matrix), so a list never
+        mixes scores from two fits. Returns ``{user_id: [(match_id,
+        similarity), ...]}`` best first; ids missing from the index or no
+        longer of the opposite role are dropped.
+        """
+        snap = self._snapshot
+        ranked = {}
+        for user_id, candidate_ids in lists.items():
+            pos = snap.row_of.get(user_id) if snap.fitted else None
+            rows = [] if pos is None else [
+                snap.row_of[c] for c in dict.fromkeys(candidate_ids)
+                if c in snap.row_of and snap.is_mentor[snap.row_of[c]] != snap.is_mentor[pos]]
+            if not rows:
+                ranked[user_id] = []
+                continue
+            rows = np.asarray(rows, dtype=np.int64)
+            sims = np.asarray((snap.matrix[rows] @ snap.matrix[pos].T).todense()).ravel()
+            order = np.argsort(-sims, kind='stable')[:top_n]
+            ranked[user_id] = [(int(snap.user_ids[rows[i]]), float(sims[i])) for i in order]
+        return ranked
+
+    def find_matches(self, current_user, all_users=None, top_n=5):
+        """Rank opposite-role users for ``current_user``.
+
+        ``all_users`` is optional: when given it restricts the candidates and
+        supplies the ``user`` objects for the result; otherwise only ids are
+        returned. The index is built from ``all_users`` on first use.
+        """
+        by_id = None
+        if all_users is not None:
+            if len(all_users) == 0:
+                return []
+            by_id = {u.id: u for u in all_users}
+            if not self._snapshot.fitted:
+                self.build_index(all_users)
+
         try:
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
-            current_vector = tfidf_matrix[0:1]
-            other_vectors = tfidf_matrix[1:]
-            
-            similarities = cosine_similarity(current_vector, other_vectors)[0]
-            
-            matches = []
-            for idx, similarity in enumerate(similarities):
-                matches.append({
-                    'user': user_data[idx],
-                    'similarity': float(similarity),
-                    'percentage': int(similarity * 100)
-                })
-            
-            matches.sort(key=lambda x: x['similarity'], reverse=True)
-            return matches[:top_n]
+            ranked = self.top_matches(current_user, top_n,
+                                      candidate_ids=by_id.keys() if by_id is not None else None)
         except Exception as e:
             print(f"Error in matching: {e}")
             return []
-    
+
+        matches = []
+        for user_id, similarity in ranked:
+            match = {
+                'user_id': user_id,
+                'similarity': similarity,
+                'percentage': int(similarity * 100)
+            }
+            if by_id is not None:
+                match['user'] = by_id[user_id]
+            matches.append(match)
+        return matches
+
+    def ann_recall_report(self, users, top_n=5, probes=None):
+        """Compare ANN against exact top-N for ``users`` (e.g. a random sample).
+
+        Returns mean recall@top_n, mean latency of both paths in ms and the
+        mean fraction of the index scored per ANN query. An ANN hit counts
+        when it scores at least the exact N-th best, so ties don't read as
+        misses.
+        """
+        snap = self._snapshot
+        recalls, ann_ms, exact_ms, scanned = [], [], [], []
+        for user in users:
+            started = time.perf_counter()
+            exact = self.top_matches(user, top_n, exact=True)
+            exact_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            approx = self.top_matches(user, top_n, probes=probes)
+            ann_ms.append((time.perf_counter() - started) * 1000)
+            if exact:
+                cutoff = exact[-1][1] - 1e-9
+                recalls.append(sum(1 for _, sim in approx if sim >= cutoff) / len(exact))
+            if snap.ann is not None:
+                rows = self.ann.candidates(snap.ann, self._query_vector(user, snap), probes)
+                scanned.append(len(rows) / max(len(snap.user_ids), 1))
+        return {
+            'ann_enabled': snap.ann is not None,
+            'users': len(snap.user_ids),
+            'sampled': len(recalls),
+            'top_n': top_n,
+            'probes': probes if probes is not None else (self.ann.probes if self.ann else None),
+            'recall': float(np.mean(recalls)) if recalls else 1.0,
+            'ann_ms': float(np.mean(ann_ms)) if ann_ms else 0.0,
+            'exact_ms': float(np.mean(exact_ms)) if exact_ms else 0.0,
+            'scanned_fraction': float(np.mean(scanned)) if scanned else 1.0,
+        }
+
     def _create_user_text(self, user):
         skills = ' '.join(user.get_skills_list())
         goals = ' '.join(user.get_goals_list())
-        return f"{skills} {goals} {user.bio}"
+        return f"{skills} {goals} {user.bio or ''}"
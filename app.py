@@ -1,10 +1,11 @@
 # Flask app main entry
 import os
 import json
+import logging
 import re
 import requests
 from collections import Counter
-from functools import wraps
+from functools import wraps, lru_cache
 
 # Load .env before anything else
 from dotenv import load_dotenv
@@ -12,36 +13,67 @@ load_dotenv()
 
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import (db, User, SkillProgress, MentorSession, MentorBooking, Post, Poll, Meetup, Career, Group,
+from models import (db, DATABASE_URI, User, SkillProgress, MentorSession, MentorBooking, Post, Poll, Meetup, Career, Group,
                     PostLike, PostComment, PostSave, PostView, PeerConnection, PeerRequest, PeerSession, Notification,
                     AIConversation, AIMessage, LearningPath, MockInterview, CourseProgress,
                     CourseCategory, Course, SkillQuestion, VerificationRequest,
                     CareerApplication, CodingChallenge, ChallengeSubmission, GamificationProfile,
-                    LiveMeeting, MeetingParticipant, SkillTest, TestResult, MentorFeedback, MeetupRSVP, GroupMember)
+                    LiveMeeting, MeetingParticipant, SkillTest, TestResult, MentorFeedback, MeetupRSVP, GroupMember,
+                    PollOption, CONNECTED_STATUSES)
 from flask_socketio import SocketIO, emit
 from youtube_utils import parse_roadmap_md, get_playlist_videos, get_single_video_as_list
-from ai_engine import SkillMatcher
+from ai_engine import SkillMatcher, LSHIndex, SkillBitsetIndex
 from ai_assistant import SkillSyncAI
 from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 
 # ── Firebase (imported lazily – app still works without service account) ──────
 from firebase_config import init_firebase, get_client_config
 import firebase_service as fs_svc
+import match_service as match_svc
+import reconcile_counters
+import skill_service as skill_svc   # registers the UserSkill/UserGoal sync hook
+import trending_service as trending_svc
+import post_search
+import timeline_service as timeline_svc
+from view_buffer import ViewBuffer, start_background_flush
+import viewer_state
+import poll_service as poll_svc
+from engagement_buffer import CounterBuffer
+import notification_push
+import notification_service as notif_svc
+from search_index import UserSearchIndex, SkillSuggestIndex
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///skillsync.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With more than one server process (gunicorn workers, replicas), point
+# SOCKETIO_MESSAGE_QUEUE at a shared broker (redis://redis:6379/0) so an emit
+# made in one process reaches sockets held by the others. Unset, the client
+# registry stays in this process, which is what tests and `python app.py` use.
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None,
+                    channel=os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio'))
+notification_push.init_app(socketio)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-matcher = SkillMatcher()
+# Exact matching below LSHIndex.min_rows users; LSH candidates above it.
+matcher = SkillMatcher(ann=LSHIndex(probes=int(os.environ.get('MATCH_ANN_PROBES', 4))))
+search_index = UserSearchIndex()
+skill_bits = SkillBitsetIndex()   # packed skill/goal bits for batch search scoring
 ai_mentor = SkillSyncAI()
+post_views = ViewBuffer()     # write-behind PostView inserts, flushed in the background
+# Optional per-user Bloom filters that skip the liked/saved lookup for most feed pages.
+viewer_blooms = viewer_state.ViewerBlooms() if os.environ.get('FEED_BLOOM_FILTER') == '1' else None
+post_engagement = CounterBuffer()   # coalesced share_count increments
 
 # Initialize Firebase Services
 init_firebase()
@@ -106,18 +138,65 @@ def slugify_filter(s):
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-def create_notification(user_id, title, message, type='system', link=None):
-    """Helper to create a new notification for a user"""
-    notif = Notification(
-        user_id=user_id,
-        title=title,
-        message=message,
-        type=type,
-        link=link
-    )
-    db.session.add(notif)
-    db.session.commit()
-    return notif
+def _refresh_user_indexes(user):
+    """Push a profile change into the in-memory matching indexes and match table."""
+    try:
+        matcher.update_user(user)
+        search_index.update_user(user)
+        skill_bits.update_user(user)
+        skill_suggestions.update_user(user)
+        ai_mentor.connection_index.update_user(user)
+        match_svc.refresh_after_profile_change(matcher, user)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Index refresh error for user {user.id}: {e}")
+
+def _drop_user_from_indexes(user_id):
+    """Remove a deleted account from the in-memory matching indexes and match table."""
+    matcher.remove_user(user_id)
+    search_index.remove_user(user_id)
+    skill_bits.remove_user(user_id)
+    skill_suggestions.remove_user(user_id)
+    ai_mentor.connection_index.remove_user(user_id)
+    match_svc.remove_user(user_id)
+
+_background_started = False
+
+@app.before_request
+def _start_background_jobs():
+    """Build the in-memory indexes and start periodic jobs once this process begins serving requests."""
+    global _background_started
+    if not _background_started:
+        _background_started = True
+        build_indexes()
+        # Recompute and reconcile normally run in worker.py, off the eventlet web worker.
+        if os.environ.get('BACKGROUND_JOBS_IN_PROCESS') == '1':
+            match_svc.start_background_recompute(app, matcher)
+            reconcile_counters.start_background_reconcile(app)
+        start_background_flush(app, post_views)
+        start_background_flush(app, post_engagement, post_engagement.flush_interval, name='engagement-flush')
+
+def create_notification(user_id, title, message, type='system', link=None, commit=True, digest=None,
+                        actor_id=None):
+    """Helper to create a new notification for a user.
+
+    ``commit=False`` leaves it in the caller's transaction (e.g. with the like it reports).
+    The recipient's open tabs are pushed the notification once that transaction commits.
+    Bursts of likes, comments and meeting joins on the same link merge into one unread
+    digest, whose message is ``digest`` with ``{count}`` / ``{others}`` filled in (see notification_service).
+    ``actor_id`` is who did it; a digest counts each actor once.
+    """
+    notif_svc.create(user_id, title, message, type=type, link=link, digest=digest, actor_id=actor_id)
+    if commit:
+        db.session.commit()
+
+
+def create_notifications_bulk(items, commit=True):
+    """Create many notifications (dicts of create_notification's arguments) in one INSERT."""
+    inserted = notif_svc.create_bulk(items)
+    if commit:
+        db.session.commit()
+    return inserted
 
 @app.route('/')
 def index():
@@ -213,6 +292,7 @@ def register():
             progress = SkillProgress(user_id=user.id, skill_name=skill, level=0.2)
             db.session.add(progress)
         db.session.commit()
+        _refresh_user_indexes(user)
         
         login_user(user)
 
@@ -320,6 +400,8 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
+DASHBOARD_MATCH_COUNT = 9
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
@@ -327,15 +409,15 @@ def dashboard():
     if current_user.is_mentor or current_user.role == 'mentor':
         return redirect(url_for('mentor_dashboard'))
     try:
-        # Get all users based on current user role
-        if current_user.is_mentor:
-            # Show all learners to mentors
-            matches = User.query.filter_by(is_mentor=False).all()
-            match_type = 'learners'
-        else:
-            # Show all mentors to learners
-            matches = User.query.filter_by(is_mentor=True).all()
-            match_type = 'mentors'
+        # Pre-ranked AI matches from the materialised match table
+        match_rows = match_svc.get_ranked_matches(current_user.id, limit=DASHBOARD_MATCH_COUNT)
+        if not match_rows and not match_svc.has_computed(current_user.id):
+            # Not covered by a recompute pass yet (e.g. brand-new account)
+            match_svc.refresh_user_matches(matcher, current_user)
+            match_rows = match_svc.get_ranked_matches(current_user.id, limit=DASHBOARD_MATCH_COUNT)
+        matches = [row.match_user for row in match_rows]
+        match_scores = {row.match_user_id: row.percentage for row in match_rows}
+        match_type = 'learners' if current_user.is_mentor else 'mentors'
         
         skill_progress = SkillProgress.query.filter_by(user_id=current_user.id).all()
         
@@ -351,6 +433,7 @@ def dashboard():
         
         return render_template('dashboard.html', 
                              matches=matches, 
+                             match_scores=match_scores,
                              match_type=match_type,
                              skill_progress=skill_progress,
                              upcoming_sessions=upcoming_sessions,
@@ -362,6 +445,7 @@ def dashboard():
         # Return empty data to prevent template errors
         return render_template('dashboard.html', 
                              matches=[], 
+                             match_scores={},
                              match_type='mentors',
                              skill_progress=[],
                              upcoming_sessions=[])
@@ -654,6 +738,7 @@ def update_profile():
     fs_svc.sync_user_to_firestore(current_user)
         
     db.session.commit()
+    _refresh_user_indexes(current_user)
     return jsonify({'success': True, 'message': 'Profile updated successfully'})
 
 @app.route('/verification')
@@ -781,14 +866,114 @@ def admin_verification_action():
     db.session.commit()
     return jsonify({'success': True, 'message': msg})
 
+# ── Home feed (keyset pagination) ────────────────────────────────────────────
+FEED_PAGE_SIZE = 20
+
+def _encode_feed_cursor(created_at, post_id):
+    """Feed cursor for the position ``(created_at, id)``; ``_decode_feed_cursor`` reverses it."""
+    return f"{created_at.isoformat()}_{post_id}"
+
+def _decode_feed_cursor(cursor):
+    """Return ``(created_at, id)`` from a feed cursor, or None when malformed."""
+    try:
+        stamp, post_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(stamp), int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+def _feed_query():
+    """Post query with everything a feed card renders loaded up front."""
+    return Post.query.options(
+        db.joinedload(Post.author),
+        db.joinedload(Post.poll).selectinload(Poll.option_rows),
+    )
+
+def _card_state(posts):
+    """liked_ids / saved_ids / viewed_ids of current_user for a page of cards."""
+    state = viewer_state.lookup(current_user.id, [p.id for p in posts], viewer_blooms)
+    # These cards report views next; stored ones must not count as new.
+    post_views.note_stored(current_user.id, state['viewed_ids'])
+    return state
+
+def _connections_feed_page(cursor=None, limit=FEED_PAGE_SIZE):
+    """``_feed_page`` for the "from my connections" timeline (fan-out on write)."""
+    position = _decode_feed_cursor(cursor) if cursor else None
+    post_ids, next_position = timeline_svc.page(current_user.id, position, limit)
+    posts = _feed_query().filter(Post.id.in_(post_ids)).all() if post_ids else []
+    posts.sort(key=lambda p: (p.created_at, p.id), reverse=True)
+    next_cursor = _encode_feed_cursor(*next_position) if next_position else None
+    return posts, next_cursor
+
+def _feed_page(tag_filter=None, cursor=None, limit=FEED_PAGE_SIZE, scope='all'):
+    """
+    One page of the feed, newest first, strictly after ``cursor``.
+    Seeks on the (created_at, id) index instead of OFFSET, so every page
+    costs the same however deep the reader scrolls.
+    ``scope='connections'`` reads the reader's precomputed timeline instead.
+    Returns ``(posts, next_cursor)``; next_cursor is None on the last page.
+    """
+    if scope == 'connections' and not tag_filter:
+        return _connections_feed_page(cursor, limit)
+    q = _feed_query()
+    if tag_filter:
+        q = q.filter(Post.id.in_(trending_svc.tagged_post_ids(tag_filter)))
+    position = _decode_feed_cursor(cursor) if cursor else None
+    if position:
+        created_at, post_id = position
+        q = q.filter((Post.created_at < created_at) |
+                     ((Post.created_at == created_at) & (Post.id < post_id)))
+    posts = q.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1).all()
+    next_cursor = _encode_feed_cursor(posts[limit - 1].created_at, posts[limit - 1].id) if len(posts) > limit else None
+    return posts[:limit], next_cursor
+
+@app.route('/api/search/posts')
+@login_required
+def search_posts():
+    """Ranked keyword / hashtag search over posts, with highlighted snippets."""
+    q = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    hits = post_search.search(q, limit=limit, offset=offset)
+    posts = {p.id: p for p in Post.query.options(db.joinedload(Post.author))
+             .filter(Post.id.in_([pid for pid, _, _ in hits]))} if hits else {}
+    results = []
+    for post_id, snippet, score in hits:
+        post = posts.get(post_id)
+        if post is None:
+            continue
+        results.append({
+            'id': post.id,
+            'snippet': str(snippet),
+            'score': score,
+            'created_at': post.created_at.strftime('%b %d, %Y'),
+            'likes_count': post.like_count,
+            'comments_count': post.comment_count,
+            'author': {'name': post.author.name, 'initial': post.author.name[0]},
+        })
+    return jsonify({
+        'success': True,
+        'query': q,
+        'results': results,
+        'next_offset': offset + limit if len(hits) == limit else None,
+        'backend': post_search.backend_name(),
+    })
+
+@app.route('/api/feed')
+@login_required
+def feed_page_api():
+    """Next slice of the home feed as rendered cards, for infinite scroll."""
+    posts, next_cursor = _feed_page(request.args.get('tag'), request.args.get('cursor'),
+                                    scope=request.args.get('feed', 'all'))
+    state = _card_state(posts)
+    html = ''.join(render_template('_post_card.html', post=post, **state) for post in posts)
+    return jsonify({'success': True, 'html': html, 'next_cursor': next_cursor, 'count': len(posts)})
+
 @app.route('/home')
 @login_required
 def post_home():
     tag_filter = request.args.get('tag')
-    if tag_filter:
-        posts = Post.query.filter(Post.content.contains(tag_filter)).order_by(Post.created_at.desc()).all()
-    else:
-        posts = Post.query.order_by(Post.created_at.desc()).all()
+    feed_scope = 'connections' if request.args.get('feed') == 'connections' and not tag_filter else 'all'
+    posts, next_cursor = _feed_page(tag_filter, scope=feed_scope)
 
     trending_tags = get_trending_topics(limit=6)
 
@@ -819,8 +1004,11 @@ def post_home():
 
     return render_template('home.html',
         posts=posts,
+        next_cursor=next_cursor,
         trending_tags=trending_tags,
         current_tag=tag_filter,
+        feed_scope=feed_scope,
+        **_card_state(posts),
         upcoming_sessions=upcoming_sessions,
         suggested_peers=suggested_peers,
     )
@@ -933,8 +1121,8 @@ def peer_request():
     db.session.add(peer_req)
     db.session.flush() # Flush to generate peer_req.id
     
-    # Broadcast via SocketIO
-    socketio.emit('new_peer_request', {
+    # Real-time push to the receiver, sent once the request commits
+    notification_push.push(receiver_id, 'new_peer_request', {
         'request_id': peer_req.id,
         'sender_id': current_user.id,
         'sender_name': current_user.name,
@@ -943,15 +1131,14 @@ def peer_request():
     })
     
     # DB Notification
-    from models import Notification
-    notif = Notification(
+    create_notification(
         user_id=receiver_id,
         title="New Peer Learning Request",
         message=f"{current_user.name} sent a peer request for '{skills_expected}' on {req_date.strftime('%B %d')} at {req_time.strftime('%I:%M %p')}",
         type='peer_request',
-        link=f"/peer-learning?highlight={peer_req.id}"
+        link=f"/peer-learning?highlight={peer_req.id}",
+        commit=False
     )
-    db.session.add(notif)
 
     db.session.commit()
     return jsonify({"success": True, "req_id": peer_req.id})
@@ -1017,38 +1204,36 @@ def peer_respond():
             db.session.add(session2)
 
         # Notify sender via websocket
-        socketio.emit('peer_accepted', {
+        notification_push.push(peer_req.sender_id, 'peer_accepted', {
             'request_id': peer_req.id,
             'sender_id': peer_req.sender_id,
             'receiver_id': peer_req.receiver_id
         })
         
-        from models import Notification
-        notif = Notification(
+        create_notification(
             user_id=peer_req.sender_id,
             title="Peer Request Accepted!",
             message=f"{current_user.name} accepted your request. You can join the live session at the scheduled time.",
             type='peer_accepted',
-            link=f"/peer-session/{session1.id}"
+            link=f"/peer-session/{session1.id}",
+            commit=False
         )
-        db.session.add(notif)
         
     elif response == 'reject':
         peer_req.status = 'Rejected'
         # Notify sender via websocket optionally
-        socketio.emit('peer_rejected', {
+        notification_push.push(peer_req.sender_id, 'peer_rejected', {
             'request_id': peer_req.id,
             'sender_id': peer_req.sender_id
         })
         
-        from models import Notification
-        notif = Notification(
+        create_notification(
             user_id=peer_req.sender_id,
             title="Peer Request Declined",
             message=f"{current_user.name} is unavailable at this time.",
-            type='peer_rejected'
+            type='peer_rejected',
+            commit=False
         )
-        db.session.add(notif)
     
     db.session.commit()
     return jsonify({"success": True})
@@ -1155,9 +1340,42 @@ SKILL_GRAPH = {
     "figma": ["ui/ux", "design", "prototyping", "frontend"],
 }
 
-def _compute_match_score(candidate, query_skills, current_skills, current_goals):
+def _compile_skill_expansion(skill):
+    """Related skills for ``skill``: its graph entry plus every partially matching key and its entry."""
+    related = set(SKILL_GRAPH.get(skill, []))
+    for key, vals in SKILL_GRAPH.items():
+        if skill in key or key in skill:
+            related.update(vals)
+            related.add(key)
+    return frozenset(related)
+
+# Canonical (lower-case) skill -> expanded related set, compiled once at import.
+SKILL_EXPANSION = {key: _compile_skill_expansion(key) for key in SKILL_GRAPH}
+
+@lru_cache(maxsize=4096)
+def _expand_skill(skill):
+    expanded = SKILL_EXPANSION.get(skill)
+    return expanded if expanded is not None else _compile_skill_expansion(skill)
+
+# Autocomplete vocabulary: every user skill plus the graph keys.
+skill_suggestions = SkillSuggestIndex(key.title() for key in SKILL_GRAPH)
+
+def expand_query_skills(query_skills):
+    """Union of the related-skill expansions of every query skill."""
+    related = set()
+    for q in query_skills:
+        q = q.lower().strip()
+        if q:
+            related |= _expand_skill(q)
+    return related
+
+def _score_candidates(candidates, query_lower, related, current_goals):
     """
-    Compute a 0-100 match score between current_user and a candidate user.
+    Compute 0-100 match scores between current_user and every candidate at once.
+    ``query_lower`` and ``current_goals`` are lower-cased, ``related`` is the
+    caller's expansion of the query (see expand_query_skills). Skill and goal
+    overlaps are AND + popcount over ``skill_bits`` rows: each query term is
+    matched against the term vocabulary once, not against every candidate.
     Factors:
       - Skill similarity        40%
       - Related skill match     15%
@@ -1166,61 +1384,45 @@ def _compute_match_score(candidate, query_skills, current_skills, current_goals)
       - Availability bonus      10%
       - Experience bonus        10%
     """
-    candidate_skills = [s.lower().strip() for s in candidate.get_skills_list()]
-    query_lower = [q.lower().strip() for q in query_skills]
-    
-    # Build related skills set from the query
-    related = set()
-    for q in query_lower:
-        related.update(SKILL_GRAPH.get(q, []))
-        # Also check partial key matches
-        for key, vals in SKILL_GRAPH.items():
-            if q in key or key in q:
-                related.update(vals)
-                related.add(key)
-    
-    # 1. Exact skill match score (40 pts)
-    exact_hits = sum(1 for q in query_lower if any(q == cs or q in cs or cs in q for cs in candidate_skills))
-    skill_score = min(40, (exact_hits / max(len(query_lower), 1)) * 40) if query_lower else 0
-    
-    # 2. Related skill match (15 pts)
-    related_hits = sum(1 for cs in candidate_skills if cs in related)
-    related_score = min(15, related_hits * 5)
-    
-    # 3. Goal alignment (15 pts)
-    cand_goals = [g.lower().strip() for g in candidate.get_goals_list()]
-    goal_hits = sum(1 for q in query_lower if any(q in g or g in q for g in cand_goals))
-    goal_hits += sum(1 for cu in (current_goals or []) if any(cu.lower() in g or g in cu.lower() for g in cand_goals))
-    goal_score = min(15, goal_hits * 5)
-    
-    # 4. Profile completeness (10 pts)
-    completeness = 0
-    if candidate.bio: completeness += 2
-    if candidate.college_name: completeness += 2
-    if candidate.availability: completeness += 2
-    if candidate.skills: completeness += 2
-    if candidate.goals: completeness += 2
-    
-    # 5. Availability bonus (10 pts)
-    avail_score = 8 if candidate.availability else 0
-    
-    # 6. Experience (10 pts)
-    exp = candidate.years_experience or 0
-    exp_score = min(10, exp * 2)
-    
-    # If no query, produce a profile-based base score
-    if not query_lower:
-        base = completeness + avail_score + exp_score
-        return min(100, base + 40)  # provide a reasonable base
-    
-    total = skill_score + related_score + goal_score + completeness + avail_score + exp_score
-    # Normalize to ensure we hit reasonable percentages
-    return min(100, max(10, round(total)))
-
-def _user_to_dict(u, current_user_skills, current_user_goals, query_skills, conn_status_map):
-    """Serialize a user + compute match score for API response."""
+    if not candidates:
+        return []
+    n = len(candidates)
+    exact_hits = related_hits = goal_hits = [0] * n
+    if query_lower:
+        rows = skill_bits.sync(candidates)
+        # One vocabulary mask per term, then every candidate row against all of them at once.
+        # 1. Exact skill match: a skill containing, or contained in, the term
+        exact_masks = [skill_bits.mask_where(lambda cs, q=q: q == cs or q in cs or cs in q) for q in query_lower]
+        exact_hits = skill_bits.skill_hits(rows, exact_masks).tolist()
+        # 2. Related skill match: distinct candidate skills inside the expanded query
+        related_hits = skill_bits.skill_overlap(rows, skill_bits.mask(related)).tolist()
+        # 3. Goal alignment: query terms and current_user's goals against candidate goals
+        goal_masks = [skill_bits.mask_where(lambda g, q=q: q in g or g in q) for q in query_lower + current_goals]
+        goal_hits = skill_bits.goal_hits(rows, goal_masks).tolist()
+
+    scores = []
+    for candidate, exact, rel, goal in zip(candidates, exact_hits, related_hits, goal_hits):
+        # 4. Profile completeness (10 pts)
+        completeness = 2 * sum(1 for field in (candidate.bio, candidate.college_name, candidate.availability,
+                                               candidate.skills, candidate.goals) if field)
+        # 5. Availability bonus (10 pts)
+        avail_score = 8 if candidate.availability else 0
+        # 6. Experience (10 pts)
+        exp_score = min(10, (candidate.years_experience or 0) * 2)
+
+        # If no query, produce a profile-based base score
+        if not query_lower:
+            scores.append(min(100, completeness + avail_score + exp_score + 40))
+            continue
+        skill_score = min(40, (exact / len(query_lower)) * 40)
+        total = skill_score + min(15, rel * 5) + min(15, goal * 5) + completeness + avail_score + exp_score
+        # Normalize to ensure we hit reasonable percentages
+        scores.append(min(100, max(10, round(total))))
+    return scores
+
+def _user_to_dict(u, match_score, conn_status_map):
+    """Serialize a user with their precomputed match score for API response."""
     skills = u.get_skills_list()
-    match_score = _compute_match_score(u, query_skills, current_user_skills, current_user_goals)
     
     conn_info = conn_status_map.get(u.id, {})
     
@@ -1280,19 +1482,8 @@ def search_suggestions():
     if not q or len(q) < 1:
         return jsonify({"suggestions": []})
 
-    # Collect all skills from DB
-    all_users = User.query.filter(User.id != current_user.id, User.skills != '').all()
-    skill_set = set()
-    for u in all_users:
-        for s in u.get_skills_list():
-            skill_set.add(s.strip())
-
-    # Add known graph keys
-    for key in SKILL_GRAPH.keys():
-        skill_set.add(key.title())
-
-    # Filter by prefix / contains
-    matched = sorted([s for s in skill_set if q in s.lower()], key=lambda x: (not x.lower().startswith(q), x))[:8]
+    # Prefix / contains matches from the in-memory skill trie, most used first
+    matched = skill_suggestions.suggest(q, limit=8)
 
     # Add related suggestions from graph
     related = set()
@@ -1301,10 +1492,13 @@ def search_suggestions():
             for v in vals[:3]:
                 related.add(v.title())
     
-    result = list(dict.fromkeys(matched + [r for r in list(related)[:4] if r not in matched]))[:10]
+    seen = {m.lower() for m in matched}
+    result = list(dict.fromkeys(matched + [r for r in list(related)[:4] if r.lower() not in seen]))[:10]
     return jsonify({"suggestions": result})
 
 # ── Search API: Ranked Users ──────────────────────────────────────────────────
+SEARCH_ID_CHUNK = 500   # ids per IN (...) query, well under SQLite's bound-parameter limit
+
 @app.route('/api/search/users')
 @login_required
 def search_users():
@@ -1313,19 +1507,13 @@ def search_users():
     level = request.args.get('level', '')          # beginner | intermediate | expert
     available_only = request.args.get('available', '').lower() == 'true'
     top_rated = request.args.get('top_rated', '').lower() == 'true'
+    exact_skills = [s for s in request.args.get('skill', '').split(',') if s.strip()]  # canonical skill filter
 
     query_skills = [s.strip() for s in q.split(',') if s.strip()] if q else []
-    current_skills = current_user.get_skills_list()
     current_goals = current_user.get_goals_list()
 
-    # Build related skill set from query
-    related_keys = set()
-    for qs in [s.lower() for s in query_skills]:
-        related_keys.update(SKILL_GRAPH.get(qs, []))
-        for key, vals in SKILL_GRAPH.items():
-            if qs in key or key in qs:
-                related_keys.update(vals)
-                related_keys.add(key)
+    # Build related skill set from query, once for both the candidate lookup and scoring
+    related_keys = expand_query_skills(query_skills)
 
     # Base user query
     users_q = User.query.filter(User.id != current_user.id)
@@ -1340,22 +1528,20 @@ def search_users():
     if available_only:
         users_q = users_q.filter(User.availability != '', User.availability != None)
 
-    all_users = users_q.all()
+    # Exact skill filter: indexed join through UserSkill (aliases and case resolved)
+    if exact_skills:
+        users_q = users_q.filter(skill_svc.users_with_skills_filter(exact_skills))
 
-    # Skill-text filter for query
+    # Skill-text filter for query: resolve candidate ids from the inverted
+    # index first, then load only those rows.
     if query_skills:
-        def skill_matches(u):
-            u_skills_lower = [s.lower() for s in u.get_skills_list()]
-            u_goals_lower = [g.lower() for g in u.get_goals_list()]
-            combined = u_skills_lower + u_goals_lower + [u.expertise.lower() if u.expertise else ''] + [u.job_role.lower() if u.job_role else '']
-            for qs in [s.lower() for s in query_skills]:
-                if any(qs in c or c in qs for c in combined if c):
-                    return True
-            for rk in related_keys:
-                if any(rk in c or c in rk for c in combined if c):
-                    return True
-            return False
-        all_users = [u for u in all_users if skill_matches(u)]
+        candidate_ids = sorted(search_index.search(query_skills + sorted(related_keys)))
+        all_users = []
+        for start in range(0, len(candidate_ids), SEARCH_ID_CHUNK):
+            chunk = candidate_ids[start:start + SEARCH_ID_CHUNK]
+            all_users.extend(users_q.filter(User.id.in_(chunk)).order_by(User.id).all())
+    else:
+        all_users = users_q.all()
 
     # Level filter (based on years_experience)
     if level == 'beginner':
@@ -1381,7 +1567,9 @@ def search_users():
             }
 
     # Compute match scores and serialize
-    results = [_user_to_dict(u, current_skills, current_goals, query_skills, conn_status_map) for u in all_users]
+    scores = _score_candidates(all_users, [s.lower() for s in query_skills], related_keys,
+                               [g.lower() for g in current_goals])
+    results = [_user_to_dict(u, score, conn_status_map) for u, score in zip(all_users, scores)]
 
     # Sort: by match_score desc, then by connection_count desc
     results.sort(key=lambda x: (-x['match_score'], -x['connection_count']))
@@ -1780,7 +1968,8 @@ def review_submission(sub_id):
             title='Challenge Accepted!',
             message=f'Your solution to "{sub.challenge.title}" was accepted! You earned {sub.challenge.points_reward} Coins and {sub.challenge.xp_reward} XP.',
             type='system',
-            link=url_for('challenge_detail', challenge_id=sub.challenge_id)
+            link=url_for('challenge_detail', challenge_id=sub.challenge_id),
+            commit=False
         )
         flash('Submission Accepted.', 'success')
         
@@ -1791,7 +1980,8 @@ def review_submission(sub_id):
             title='Challenge Requires Revision',
             message=f'Your solution to "{sub.challenge.title}" was rejected. Feedback: {feedback}',
             type='system',
-            link=url_for('challenge_detail', challenge_id=sub.challenge_id)
+            link=url_for('challenge_detail', challenge_id=sub.challenge_id),
+            commit=False
         )
         flash('Submission Rejected.', 'info')
         
@@ -1805,63 +1995,74 @@ def admin_applications():
     # Startup connections removed
     return render_template('admin_interactions.html', applications=apps)
 
-def get_trending_topics(limit=5):
+def get_trending_topics(limit=5, window=None, with_posts=False):
     """
-    Calculates top trending hashtags for the current month using a weighted score:
-    Score = (Posts * 1.0) + (Likes * 0.5) + (Views * 0.1)
+    Top hashtags over ``window`` ('24h', '7d' or 'month') from the hourly
+    tag counters, scored (Posts * 1.0) + (Likes * 0.5) + (Views * 0.1) with
+    exponential decay. ``with_posts`` also loads recent posts per tag.
     """
-    hashtag_data = {}
-    hashtag_regex = re.compile(r'#\w+')
-    
-    # Filter only this month's posts
-    now = datetime.now()
-    month_posts = Post.query.filter(
-        db.extract('year', Post.created_at) == now.year,
-        db.extract('month', Post.created_at) == now.month
-    ).all()
-
-    for post in month_posts:
-        tags = set(hashtag_regex.findall(post.content or ""))
-        for tag in tags:
-            tag_lower = tag.lower()
-            if tag_lower not in hashtag_data:
-                hashtag_data[tag_lower] = {"count": 0, "likes": 0, "views": 0, "posts": []}
-            
-            hashtag_data[tag_lower]["count"] += 1
-            hashtag_data[tag_lower]["likes"] += len(post.likes)
-            hashtag_data[tag_lower]["views"] += (post.views_count or 0)
-            hashtag_data[tag_lower]["posts"].append(post)
-
-    # Calculate scores
-    scored_tags = []
-    for tag, stats in hashtag_data.items():
-        score = (stats["count"] * 1.0) + (stats["likes"] * 0.5) + (stats["views"] * 0.1)
-        scored_tags.append({
-            "tag": tag,
-            "score": score,
-            "count": stats["count"],
-            "likes": stats["likes"],
-            "views": stats["views"],
-            "posts": stats["posts"]
-        })
-
-    # Sort by score descending
-    scored_tags.sort(key=lambda x: x["score"], reverse=True)
-    return scored_tags[:limit]
+    topics = trending_svc.trending(window, limit)
+    if with_posts:
+        posts = trending_svc.recent_posts_by_tag([t['tag'] for t in topics], window)
+        for topic in topics:
+            topic['posts'] = posts.get(topic['tag'], [])
+    return topics
 
 @app.route('/trending')
 @login_required
 def trending():
-    trending_data = get_trending_topics(limit=10)
+    window = trending_svc.resolve_window(request.args.get('window'))
+    trending_data = get_trending_topics(limit=10, window=window, with_posts=True)
     # Reformat for the older template structure if needed, or update template
     top_tags = [(item['tag'], item['count']) for item in trending_data]
     hashtag_to_posts = {item['tag']: item['posts'] for item in trending_data}
-    return render_template('trending.html', top_tags=top_tags, hashtag_to_posts=hashtag_to_posts)
+    return render_template('trending.html', top_tags=top_tags, hashtag_to_posts=hashtag_to_posts,
+                           window=window, windows=list(trending_svc.WINDOWS))
+
+COMMENT_PAGE_SIZE = 20
+COMMENT_PREVIEW = 3
+
+def _serialize_comment(c):
+    return {
+        "id": c.id,
+        "content": c.content,
+        "author_name": c.author.name,
+        "author_initial": c.author.name[0],
+        "created_at": c.created_at.strftime('%H:%M')
+    }
+
+def _comment_page(post_id, after_id=None, limit=COMMENT_PAGE_SIZE):
+    """Oldest-first comments of a post after comment ``after_id``, authors joined in.
+    Returns ``(comments, next_cursor)``; next_cursor is None on the last page."""
+    q = (PostComment.query.options(db.joinedload(PostComment.author))
+         .filter(PostComment.post_id == post_id))
+    if after_id:
+        q = q.filter(PostComment.id > after_id)
+    comments = q.order_by(PostComment.id).limit(limit + 1).all()
+    next_cursor = comments[limit - 1].id if len(comments) > limit else None
+    return comments[:limit], next_cursor
+
+@app.route('/api/post/<int:post_id>/comments')
+@login_required
+def get_post_comments(post_id):
+    """One cursor page of a post's comments."""
+    total = db.session.query(Post.comment_count).filter_by(id=post_id).scalar()
+    if total is None:
+        abort(404)
+    limit = min(max(request.args.get('limit', COMMENT_PAGE_SIZE, type=int), 1), 100)
+    comments, next_cursor = _comment_page(post_id, request.args.get('cursor', type=int), limit)
+    return jsonify({
+        "success": True,
+        "comments": [_serialize_comment(c) for c in comments],
+        "next_cursor": next_cursor,
+        "total": total
+    })
 
 @app.route('/api/post/<int:post_id>')
 @login_required
 def get_post_detail(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(db.joinedload(Post.author)).filter_by(id=post_id).first_or_404()
+    comments, next_cursor = _comment_page(post_id, limit=COMMENT_PREVIEW)
     return jsonify({
         "success": True,
         "post": {
@@ -1870,37 +2071,31 @@ def get_post_detail(post_id):
             "link": post.link,
             "created_at": post.created_at.strftime('%b %d, %Y · %I:%M %p'),
             "views_count": post.views_count,
-            "likes_count": len(post.likes),
-            "comments_count": len(post.comments),
+            "likes_count": post.like_count,
+            "comments_count": post.comment_count,
             "author": {
                 "name": post.author.name,
                 "initial": post.author.name[0],
-                "is_mentor": post.author.is_mentor
+                "is_mentor": post.author.is_mentor,
+                "is_verified": post.author.is_verified
             },
-            "comments": [{
-                "content": c.content,
-                "author_name": c.author.name,
-                "author_initial": c.author.name[0],
-                "created_at": c.created_at.strftime('%H:%M')
-            } for c in post.comments]
+            # First few only; the rest come from /api/post/<id>/comments?cursor=...
+            "comments": [_serialize_comment(c) for c in comments],
+            "comments_next_cursor": next_cursor
         }
     })
 
 @app.route('/api/post/view/<int:post_id>', methods=['POST'])
 @login_required
 def track_post_view(post_id):
-    post = Post.query.get_or_404(post_id)
+    views = db.session.query(Post.views_count).filter_by(id=post_id).first()
+    if views is None:
+        abort(404)
     
-    # Check if this user has already viewed the post
-    existing = PostView.query.filter_by(post_id=post_id, user_id=current_user.id).first()
-    
-    if not existing:
-        view = PostView(post_id=post_id, user_id=current_user.id)
-        db.session.add(view)
-        db.session.commit()
-        return jsonify({"success": True, "views": PostView.query.filter_by(post_id=post_id).count(), "new_view": True})
-        
-    return jsonify({"success": True, "views": PostView.query.filter_by(post_id=post_id).count(), "new_view": False})
+    # Queued, not written: the view buffer inserts in bulk and bumps views_count.
+    new_view = post_views.record(post_id, current_user.id)
+    return jsonify({"success": True, "views": (views[0] or 0) + post_views.pending_for(post_id),
+                    "new_view": new_view})
 
 @app.route('/create-post', methods=['POST'])
 @login_required
@@ -1917,12 +2112,14 @@ def create_post():
     post = Post(user_id=current_user.id, content=content, link=link)
     db.session.add(post)
     db.session.flush()
+    trending_svc.index_post(post)
+    timeline_svc.fan_out(post)
 
     if poll_question and poll_options:
         options_list = [o.strip() for o in poll_options.split(';') if o.strip()]
         if len(options_list) >= 2:
             poll = Poll(post_id=post.id, question=poll_question, options=';'.join(options_list))
-            poll.set_votes_list([0] * len(options_list))
+            poll.option_rows = [PollOption(position=i) for i in range(len(options_list))]
             db.session.add(poll)
 
     db.session.commit()
@@ -1933,13 +2130,10 @@ def create_post():
 @login_required
 def vote(poll_id, option_index):
     poll = Poll.query.get_or_404(poll_id)
-    votes_list = poll.get_votes_list()
     
-    if 0 <= option_index < len(votes_list):
-        votes_list[option_index] += 1
-        poll.set_votes_list(votes_list)
-        db.session.commit()
-        return jsonify({'success': True, 'votes': votes_list})
+    if 0 <= option_index < len(poll.get_options_list()):
+        status = poll_svc.cast_vote(poll, current_user.id, option_index)
+        return jsonify({'success': True, 'status': status, 'votes': poll.get_votes_list()})
     
     return jsonify({'success': False, 'error': 'Invalid option index'}), 400
 
@@ -1963,35 +2157,76 @@ def update_progress(skill_id):
 
 # --- Social Interaction Routes ---
 
+def _bump_post_counter(post_id, column, delta):
+    """Atomic ``column = column + delta`` on one post, inside the caller's transaction."""
+    Post.query.filter_by(id=post_id).update(
+        {column: db.func.coalesce(column, 0) + delta}, synchronize_session=False)
+
+
+# Post counter column -> hashtag trend counter it also feeds.
+_TREND_FIELDS = {'like_count': 'likes', 'views_count': 'views'}
+
+
+def _bump_post_counters(post_id, column, delta):
+    """``_bump_post_counter`` plus the matching hourly hashtag counter, if any."""
+    _bump_post_counter(post_id, column, delta)
+    field = _TREND_FIELDS.get(column.key)
+    if field:
+        trending_svc.record_engagement(post_id, **{field: delta})
+
+
+def _add_post_row(model, post_id, column):
+    """Insert current_user's ``model`` row for a post and bump ``column``. Caller commits.
+
+    Returns False if the row already existed (a concurrent request won the race).
+    """
+    try:
+        db.session.add(model(post_id=post_id, user_id=current_user.id))
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    _bump_post_counters(post_id, column, 1)
+    return True
+
+
+def _toggle_post_row(model, post_id, column):
+    """Add or remove current_user's like/save on a post. Returns True if it is now set. Caller commits."""
+    removed = model.query.filter_by(post_id=post_id, user_id=current_user.id).delete(synchronize_session=False)
+    if removed:
+        _bump_post_counters(post_id, column, -removed)
+        return False
+    if _add_post_row(model, post_id, column) and viewer_blooms is not None:
+        viewer_blooms.note(current_user.id, 'liked' if model is PostLike else 'saved', post_id)
+    return True
+
 @app.route('/like/<int:post_id>', methods=['POST'])
 @login_required
 def like_post(post_id):
     post = Post.query.get_or_404(post_id)
-    existing = PostLike.query.filter_by(post_id=post_id, user_id=current_user.id).first()
     
-    if existing:
-        db.session.delete(existing)
+    if not _toggle_post_row(PostLike, post_id, Post.like_count):
         db.session.commit()
-        return jsonify({'success': True, 'liked': False})
+        return jsonify({'success': True, 'liked': False, 'likes_count': post.like_count})
     
-    like = PostLike(post_id=post_id, user_id=current_user.id)
-    db.session.add(like)
-    db.session.commit()
-    
-    # Notify post author
+    # Notify post author (same transaction as the like)
     if post.user_id != current_user.id:
         create_notification(
             user_id=post.user_id,
             title="New Like!",
             message=f"{current_user.name} liked your post: \"{post.content[:30]}...\"",
             type="like",
-            link=url_for('post_home')
+            link=url_for('post_home') + f'#post-{post.id}',
+            commit=False,
+            digest=f"{current_user.name} and {{others}} liked your post: \"{post.content[:30]}...\"",
+            actor_id=current_user.id,
         )
+    db.session.commit()
     
     return jsonify({
         'success': True, 
         'liked': True, 
-        'likes_count': PostLike.query.filter_by(post_id=post_id).count()
+        'likes_count': post.like_count
     })
 
 @app.route('/comment/<int:post_id>', methods=['POST'])
@@ -2005,22 +2240,27 @@ def comment_post(post_id):
     
     comment = PostComment(post_id=post_id, user_id=current_user.id, content=content)
     db.session.add(comment)
-    db.session.commit()
+    _bump_post_counter(post_id, Post.comment_count, 1)
     
-    # Notify post author
+    # Notify post author (same transaction as the comment)
     if post.user_id != current_user.id:
         create_notification(
             user_id=post.user_id,
             title="New Comment!",
             message=f"{current_user.name} commented on your post: \"{content[:30]}...\"",
             type="comment",
-            link=url_for('post_home')
+            link=url_for('post_home') + f'#post-{post.id}',
+            commit=False,
+            digest=f"{current_user.name} and {{others}} commented on your post: \"{post.content[:30]}...\"",
+            actor_id=current_user.id,
         )
+    db.session.commit()
     
     return jsonify({
         'success': True,
-        'comments_count': PostComment.query.filter_by(post_id=post_id).count(),
+        'comments_count': post.comment_count,
         'comment': {
+            'id': comment.id,
             'author_name': current_user.name,
             'author_initial': current_user.name[0],
             'content': content,
@@ -2031,25 +2271,19 @@ def comment_post(post_id):
 @app.route('/save/<int:post_id>', methods=['POST'])
 @login_required
 def save_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    existing = PostSave.query.filter_by(post_id=post_id, user_id=current_user.id).first()
-    
-    if existing:
-        db.session.delete(existing)
-        db.session.commit()
-        return jsonify({'success': True, 'saved': False})
-    
-    save = PostSave(post_id=post_id, user_id=current_user.id)
-    db.session.add(save)
+    Post.query.get_or_404(post_id)
+    saved = _toggle_post_row(PostSave, post_id, Post.save_count)
     db.session.commit()
-    return jsonify({'success': True, 'saved': True})
+    return jsonify({'success': True, 'saved': saved})
 
 @app.route('/share/<int:post_id>', methods=['POST'])
 @login_required
 def share_post(post_id):
     post = Post.query.get_or_404(post_id)
-    post.share_count += 1
+    # Atomic increment, coalesced with other shares into one write per flush interval.
+    post_engagement.add(post_id, 'share_count')
     db.session.commit()
+    share_count = (post.share_count or 0) + post_engagement.pending_for(post_id, 'share_count')
     
     # Generate a shareable link (using hashtag filter as a deep link)
     import re
@@ -2059,13 +2293,40 @@ def share_post(post_id):
     
     return jsonify({
         'success': True, 
-        'share_count': post.share_count,
+        'share_count': share_count,
         'share_url': share_url,
         'content': post.content
     })
 
 # --- Peer Live Connection Routes ---
 
+def _transition_connection(conn, status, **values):
+    """
+    Move ``conn`` to ``status`` and keep both users' connection_count in step.
+
+    The UPDATE is conditional on the status we read, so two racing requests
+    can't both apply the same transition (and double-count it). Returns
+    False when the connection changed underneath us. Caller commits.
+    """
+    old_status = conn.status
+    changed = (PeerConnection.query
+               .filter_by(id=conn.id, status=old_status)
+               .update(dict(status=status, **values), synchronize_session=False))
+    if not changed:
+        return False
+    delta = (status in CONNECTED_STATUSES) - (old_status in CONNECTED_STATUSES)
+    if delta:
+        User.query.filter(User.id.in_((conn.sender_id, conn.receiver_id))).update(
+            {User.connection_count: User.connection_count + delta}, synchronize_session=False)
+        # Connections timelines follow the connection.
+        if delta > 0:
+            timeline_svc.link(conn.sender_id, conn.receiver_id)
+        else:
+            timeline_svc.unlink(conn.sender_id, conn.receiver_id)
+    db.session.expire(conn)
+    return True
+
+
 @app.route('/api/connect/request/<int:user_id>', methods=['POST'])
 @login_required
 def request_connection(user_id):
@@ -2097,7 +2358,7 @@ def request_connection(user_id):
     )
 
     # Real-time socket event
-    socketio.emit('new_connection_request', {
+    notification_push.send([user_id], 'new_connection_request', {
         'connection_id': new_conn.id,
         'sender_id': current_user.id,
         'sender_name': current_user.name,
@@ -2119,7 +2380,10 @@ def withdraw_connection(connection_id):
     if conn.status != 'Pending':
         return jsonify({'success': False, 'error': 'Can only withdraw pending requests'}), 400
 
-    db.session.delete(conn)
+    # Only pending rows are deleted, so connection_count is unaffected; the
+    # status guard keeps a request accepted in the meantime from vanishing.
+    if PeerConnection.query.filter_by(id=conn.id, status='Pending').delete(synchronize_session=False):
+        notification_push.push(conn.receiver_id, 'connection_withdrawn', {'connection_id': conn.id})
     db.session.commit()
     return jsonify({'success': True})
 
@@ -2132,11 +2396,9 @@ def accept_connection(connection_id):
     if conn.receiver_id != current_user.id:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 403
 
-    if conn.status != 'Pending':
+    if conn.status != 'Pending' or not _transition_connection(
+            conn, 'Accepted', expires_at=datetime.utcnow() + timedelta(days=365)):  # Connections don't expire
         return jsonify({'success': False, 'error': 'Connection is not pending'}), 400
-
-    conn.status = 'Accepted'
-    conn.expires_at = datetime.utcnow() + timedelta(days=365)  # Connections don't expire
     db.session.commit()
 
     # LinkedIn-style notification for the original sender
@@ -2149,7 +2411,7 @@ def accept_connection(connection_id):
     )
 
     # Real-time socket event
-    socketio.emit('connection_accepted', {
+    notification_push.send([conn.sender_id], 'connection_accepted', {
         'connection_id': conn.id,
         'sender_id': conn.sender_id,
         'receiver_id': conn.receiver_id,
@@ -2167,7 +2429,8 @@ def reject_connection(connection_id):
     if conn.receiver_id != current_user.id:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 403
 
-    conn.status = 'Rejected'
+    if not _transition_connection(conn, 'Rejected'):
+        return jsonify({'success': False, 'error': 'Connection was updated concurrently'}), 409
     db.session.commit()
 
     # Notify sender their request was declined
@@ -2224,8 +2487,7 @@ def notifications():
 @app.route('/api/notifications/unread-count')
 @login_required
 def unread_count():
-    count = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
-    return jsonify({'count': count})
+    return jsonify({'count': current_user.unread_notification_count or 0})
 
 @app.route('/api/notifications/mark-read/<int:notification_id>', methods=['POST'])
 @login_required
@@ -2234,14 +2496,14 @@ def mark_read(notification_id):
     if notif.user_id != current_user.id:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 403
     
-    notif.is_read = True
+    notif_svc.mark_read(notif)
     db.session.commit()
     return jsonify({'success': True})
 
 @app.route('/api/notifications/mark-all-read', methods=['POST'])
 @login_required
 def mark_all_read():
-    Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
+    notif_svc.mark_all_read(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -2339,24 +2601,25 @@ def create_booking():
         status='pending'
     )
     db.session.add(booking)
-    db.session.commit()
 
     mode_labels = {'video': 'Video Call', 'audio': 'Audio Call', 'chat': 'Chat'}
-    # Notify mentor
+    # Notify mentor (same transaction as the booking)
     create_notification(
         user_id=m_id,
         title='📅 New Booking Request',
         message=f'{current_user.name} requested a {mode_labels.get(mode, mode)} session on "{topic}" — {req_date.strftime("%b %d")} at {req_time.strftime("%I:%M %p")}',
         type='booking',
-        link=url_for('mentor_dashboard') + '#bookings'
+        link=url_for('mentor_dashboard') + '#bookings',
+        commit=False
     )
+    db.session.commit()
 
     # Sync to Firestore
     import firebase_service as fs_svc
     fs_svc.sync_booking_to_firestore(booking)
 
     # Real-time push to mentor
-    socketio.emit('new_booking_request', { 'booking': booking.to_dict() })
+    notification_push.send([m_id], 'new_booking_request', {'booking': booking.to_dict()})
 
     return jsonify({'success': True, 'booking_id': booking.id, 'booking': booking.to_dict()})
 
@@ -2392,24 +2655,24 @@ def accept_booking(booking_id):
     
     booking.meeting_link = meeting.meeting_link
     booking.status = 'accepted'
-    
-    db.session.commit()
 
-    # Notify student
+    # Notify student (same transaction as the acceptance)
     create_notification(
         user_id=booking.student_id,
         title='🎉 Booking Accepted!',
         message=f'{current_user.name} accepted your session on "{booking.topic}". Room ready at {booking.time.strftime("%I:%M %p")}.',
         type='booking_accepted',
-        link=url_for('my_bookings')
+        link=url_for('my_bookings'),
+        commit=False
     )
+    db.session.commit()
 
     # Mirror state to Firestore for chat unlock
     import firebase_service as fs_svc
     fs_svc.sync_booking_to_firestore(booking)
 
     # Real-time push
-    socketio.emit('booking_accepted', {'booking': booking.to_dict()})
+    notification_push.send([booking.student_id], 'booking_accepted', {'booking': booking.to_dict()})
 
     return jsonify({'success': True, 'booking': booking.to_dict()})
 
@@ -2427,32 +2690,23 @@ def reject_booking(booking_id):
     data = request.get_json() or {}
     booking.reject_reason = data.get('reason', '')
     booking.status = 'rejected'
-    db.session.commit()
-    
-    import firebase_service as fs_svc
-    fs_svc.sync_booking_to_firestore(booking)
 
-    # Notify student
+    # Notify student (same transaction as the rejection)
     create_notification(
         user_id=booking.student_id,
         title='❌ Booking Rejected',
         message=f'{current_user.name} was unable to accept your session request. Reason: {booking.reject_reason or "No reason provided"}',
         type='booking_rejected',
-        link=url_for('my_bookings')
+        link=url_for('my_bookings'),
+        commit=False
     )
+    db.session.commit()
 
-    return jsonify({'success': True, 'booking': booking.to_dict()})
-
-    create_notification(
-        user_id=booking.student_id,
-        title='⚠️ Booking Unavailable',
-        message=f'{current_user.name} is unavailable for your "{booking.topic}" session. Consider booking a different time.',
-        type='booking_rejected',
-        link=url_for('my_bookings')
-    )
+    import firebase_service as fs_svc
+    fs_svc.sync_booking_to_firestore(booking)
+    notification_push.send([booking.student_id], 'booking_rejected', {'booking': booking.to_dict()})
 
-    socketio.emit('booking_rejected', {'booking': booking.to_dict()})
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'booking': booking.to_dict()})
 
 
 @app.route('/api/booking/<int:booking_id>/cancel', methods=['POST'])
@@ -2466,17 +2720,18 @@ def cancel_booking(booking_id):
         return jsonify({'success': False, 'error': 'Cannot cancel this booking'}), 400
 
     booking.status = 'cancelled'
-    db.session.commit()
-
     create_notification(
         user_id=booking.mentor_id,
         title='❌ Booking Cancelled',
         message=f'{current_user.name} cancelled the session on "{booking.topic}" scheduled for {booking.date.strftime("%b %d")}.',
         type='booking_cancelled',
-        link=url_for('mentor_dashboard') + '#bookings'
+        link=url_for('mentor_dashboard') + '#bookings',
+        commit=False
     )
+    db.session.commit()
 
-    socketio.emit('booking_cancelled', {'booking': booking.to_dict()})
+    notification_push.send([booking.mentor_id, booking.student_id], 'booking_cancelled',
+                           {'booking': booking.to_dict()})
     return jsonify({'success': True})
 
 
@@ -2578,8 +2833,7 @@ def ai_chat():
             action_data = ai_mentor.weekly_insights(current_user, db.session)
             response_text += "\n\n" + _format_weekly_insights(action_data)
         elif action == 'connection_suggestions':
-            all_users = User.query.all()
-            action_data = ai_mentor.suggest_connections(current_user, all_users)
+            action_data = ai_mentor.suggest_connections(current_user)
             response_text += "\n\n" + _format_connections(action_data)
 
         # Save assistant message
@@ -2822,8 +3076,7 @@ def ai_weekly_insights():
 @login_required
 def ai_connection_suggestions():
     try:
-        all_users = User.query.all()
-        result = ai_mentor.suggest_connections(current_user, all_users)
+        result = ai_mentor.suggest_connections(current_user)
         return jsonify({'suggestions': result})
     except Exception as e:
         print(f"Connection suggestions error: {e}")
@@ -2859,6 +3112,7 @@ def admin_login():
                 user.set_password('admin123')
                 db.session.add(user)
                 db.session.commit()
+                _refresh_user_indexes(user)
             
             login_user(user)
             flash('Welcome back, System Admin!', 'success')
@@ -2990,9 +3244,10 @@ def admin_recordings():
 @login_required
 @admin_required
 def admin_trending():
-    from app import get_trending_topics # Ensure helper is accessible
-    trending_data = get_trending_topics(limit=20)
-    return render_template('admin_trending.html', trending_data=trending_data)
+    window = trending_svc.resolve_window(request.args.get('window'))
+    trending_data = get_trending_topics(limit=20, window=window)
+    return render_template('admin_trending.html', trending_data=trending_data,
+                           window=window, windows=list(trending_svc.WINDOWS))
 
 @app.route('/admin/user/block/<int:user_id>', methods=['POST'])
 @login_required
@@ -3022,6 +3277,7 @@ def admin_delete_user(user_id):
     user_name = user.name
     db.session.delete(user)
     db.session.commit()
+    _drop_user_from_indexes(user_id)
     # Mirror to Firestore
     fs_svc.delete_user_from_firestore(user_id)
     flash(f'User "{user_name}" has been permanently deleted.', 'success')
@@ -3037,6 +3293,7 @@ def admin_approve_mentor(user_id):
     user.role = 'mentor'
     user.is_mentor = True
     db.session.commit()
+    _refresh_user_indexes(user)
     fs_svc.update_user_role_in_firestore(user_id, 'mentor')
     return jsonify({'success': True, 'message': f'{user.name} has been approved as a Mentor'})
 
@@ -3052,6 +3309,7 @@ def admin_demote_user(user_id):
     user.role = 'student'
     user.is_mentor = False
     db.session.commit()
+    _refresh_user_indexes(user)
     fs_svc.update_user_role_in_firestore(user_id, 'student')
     return jsonify({'success': True, 'message': f'{user.name} has been demoted to Student'})
 
@@ -3178,6 +3436,7 @@ def admin_bootstrap():
         current_user.role = 'admin'
         current_user.is_mentor = False
         db.session.commit()
+        _refresh_user_indexes(current_user)
         fs_svc.update_user_role_in_firestore(current_user.id, 'admin')
         flash(f'🎉 {current_user.name} is now Super Admin!', 'success')
         return redirect(url_for('admin_dashboard'))
@@ -3190,7 +3449,8 @@ def admin_bootstrap():
 @admin_required
 def admin_cancel_peer(session_id):
     session_obj = PeerConnection.query.get_or_404(session_id)
-    session_obj.status = 'Cancelled'
+    if not _transition_connection(session_obj, 'Cancelled'):
+        return jsonify({'success': False, 'error': 'Session was updated concurrently'}), 409
     db.session.commit()
     return jsonify({'success': True, 'message': 'Session cancelled by administrator.'})
 
@@ -3514,6 +3774,17 @@ def get_meeting(meeting_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _notify_meeting_participants(meeting, title, message, link=None):
+    """Notify everyone who joined ``meeting`` except the editor, as one multi-row INSERT in the caller's transaction."""
+    user_ids = [uid for (uid,) in db.session.query(MeetingParticipant.user_id)
+                .filter(MeetingParticipant.meeting_id == meeting.id, MeetingParticipant.user_id != current_user.id)]
+    return create_notifications_bulk([
+        {'user_id': uid, 'title': title, 'message': message, 'type': 'meeting', 'link': link,
+         'actor_id': current_user.id}
+        for uid in user_ids
+    ], commit=False)
+
+
 @app.route('/api/meetings/<int:meeting_id>/update', methods=['POST'])
 @login_required
 @mentor_required
@@ -3552,6 +3823,18 @@ def update_meeting(meeting_id):
         if 'status' in data:
             meeting.status = data['status']
 
+        # Participants hear about changes that affect attending (same transaction as the edit)
+        changed = [label for attr, label in (('scheduled_at', 'time'), ('meeting_link', 'link'),
+                                             ('status', 'status'))
+                   if db.inspect(meeting).attrs[attr].history.has_changes()]
+        link = url_for('live_sessions') + f'#meeting-{meeting.id}'
+        if 'status' in changed and meeting.status == 'cancelled':
+            _notify_meeting_participants(meeting, 'Meeting Cancelled',
+                                         f'"{meeting.title}" has been cancelled by the host', link=link)
+        elif changed:
+            _notify_meeting_participants(meeting, 'Meeting Updated',
+                                         f'"{meeting.title}" has a new {" and ".join(changed)}', link=link)
+
         meeting.updated_at = datetime.utcnow()
         db.session.commit()
         fs_svc.sync_meeting_to_firestore(meeting)
@@ -3574,6 +3857,9 @@ def delete_meeting(meeting_id):
         if meeting.creator_id != current_user.id and current_user.role != 'admin':
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
 
+        # Tell participants before their MeetingParticipant rows go with the meeting
+        _notify_meeting_participants(meeting, 'Meeting Cancelled',
+                                     f'"{meeting.title}" has been cancelled by the host')
         db.session.delete(meeting)
         db.session.commit()
 
@@ -3606,13 +3892,16 @@ def join_meeting(meeting_id):
             participant = MeetingParticipant(meeting_id=meeting_id, user_id=current_user.id)
             db.session.add(participant)
 
-            # Notify mentor
+            # Notify mentor; a burst of joins becomes one digest
             create_notification(
                 user_id=meeting.creator_id,
                 title='New Meeting Participant',
                 message=f'{current_user.name} joined your meeting "{meeting.title}"',
                 type='meeting',
-                link=url_for('mentor_dashboard')
+                link=url_for('mentor_dashboard') + f'#meeting-{meeting.id}',
+                commit=False,
+                digest=f'{{count}} people joined your meeting "{meeting.title}"',
+                actor_id=current_user.id,
             )
             db.session.commit()
 
@@ -3837,25 +4126,57 @@ def init_sample_data():
     pass
 
 
-# Initialize database
-with app.app_context():
+def init_db():
+    """
+    Create tables and indexes, patch counter columns and install post search.
+    Not run on import: once per database, before any server or worker starts
+    (init_db.py, the initContainer in deployment.yaml). Needs an app context.
+    """
     try:
         print("Creating database tables...")
         db.create_all()
+        if reconcile_counters.ensure_counter_columns():
+            # Freshly added counter columns start at 0; count them once now.
+            reconcile_counters.reconcile_all()
+        # create_all() skips indexes on tables that already exist.
+        for index in (*Post.__table__.indexes, *PostComment.__table__.indexes, *Notification.__table__.indexes):
+            index.create(db.engine, checkfirst=True)
+        print(f"Post search backend: {post_search.install(db.engine)}")
         print("Database tables created successfully.")
         
         # Initialize sample data
         init_sample_data()
-        
-    except Exception as e:
-        print(f"Error during database initialization: {e}")
+    except Exception:
+        logger.exception("Database initialization failed")
         # Manual intervention required if schema is broken to prevent accidental data loss.
         # db.create_all() will still attempt to create new tables if possible.
+        db.session.rollback()
         try:
             db.create_all()
-        except:
-            pass
+        except Exception:
+            logger.exception("create_all() retry failed")
+
+
+def build_indexes():
+    """Fit the in-memory matching and search indexes once; profile writes keep them current afterwards."""
+    try:
+        all_users = User.query.all()
+        matcher.build_index(all_users)
+        search_index.build(all_users)
+        skill_bits.build_index(all_users)
+        skill_suggestions.build(all_users)
+        ai_mentor.connection_index.build(all_users)
+        print(f"In-memory indexes built for {len(all_users)} users.")
+    except Exception:
+        # Search, suggestions and matches stay empty until each profile is next saved.
+        logger.exception("In-memory index build failed")
+        db.session.rollback()
+
 
 if __name__ == '__main__':
-    
+    # The dev server is the only process, so it also initializes the database
+    # (init_db.py in the container) and runs the worker.py jobs.
+    with app.app_context():
+        init_db()
+    os.environ.setdefault('BACKGROUND_JOBS_IN_PROCESS', '1')
     socketio.run(app, host='0.0.0.0', port=5005, debug=True)
\ No newline at end of file
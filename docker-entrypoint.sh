@@ -1,14 +1,40 @@
 #!/bin/sh
 set -e
 
-echo "Initializing local SQLite database..."
-python init_db.py
+# Prepare the database: schema, counter columns, Firebase restore. Runs
+# before any process that uses it, and never alongside another copy.
+setup_database() {
+    echo "Initializing local SQLite database..."
+    python init_db.py
 
-echo "Restoring users from Firebase to local database..."
-python restore_users.py
+    echo "Patching counter columns and repairing counters..."
+    python reconcile_counters.py
 
-echo "Restoring meetings from Firebase to local database..."
-python restore_meetings.py
+    echo "Restoring users from Firebase to local database..."
+    python restore_users.py
+
+    echo "Restoring meetings from Firebase to local database..."
+    python restore_meetings.py
+}
+
+case "$1" in
+    init)
+        # initContainer (deployment.yaml): finishes before the web and worker containers start.
+        setup_database
+        exit 0
+        ;;
+    worker)
+        # Maintenance jobs (worker.py). Never touches the schema; expects `init` to have run.
+        echo "Starting background worker..."
+        exec python worker.py
+        ;;
+esac
+
+# Standalone container (docker run): set up here. Under deployment.yaml the
+# initContainer already did, so SKIP_DB_SETUP=1.
+if [ "$SKIP_DB_SETUP" != "1" ]; then
+    setup_database
+fi
 
 echo "Starting application..."
 exec "$@"
@@ -0,0 +1,90 @@
+"""
+engagement_buffer.py
+────────────────────
+Coalescing buffer for pure counter events on Post (shares).
+
+A share has no row of its own, only ``share_count``. During a burst on a
+viral post, every share would otherwise be its own write transaction on
+the same row. add() accumulates ``{(post_id, column): delta}`` in memory,
+and flush() applies all of it as atomic ``column = column + delta``
+UPDATEs in one transaction per interval. ``flush_interval <= 0`` turns
+buffering off: add() then issues the increment in the caller's
+transaction, and the caller commits.
+
+Counters that have a child table (likes, saves, comments, views) are not
+buffered. reconcile_counters recounts them from their rows, and it would
+race with deltas still waiting here.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+from collections import Counter
+
+from models import db, Post
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('ENGAGEMENT_FLUSH_INTERVAL', 2))
+BUFFERED_COLUMNS = ('share_count',)
+
+
+class CounterBuffer:
+    def __init__(self, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()       # (post_id, column) -> delta
+        self.wakeup = threading.Event()
+
+    @property
+    def buffered(self) -> bool:
+        return self.flush_interval > 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, post_id: int, column: str, delta: int = 1) -> None:
+        """Count ``delta`` towards ``Post.<column>``: queued, or written now when unbuffered."""
+        if column not in BUFFERED_COLUMNS:
+            raise ValueError(f"{column} is not a buffered counter")
+        if not self.buffered:
+            _increment(column, [{'b_id': post_id, 'b_delta': delta}])
+            return
+        with self._lock:
+            self._pending[post_id, column] += delta
+
+    def pending_for(self, post_id: int, column: str) -> int:
+        with self._lock:
+            return self._pending.get((post_id, column), 0)
+
+    def flush(self) -> int:
+        """Apply every queued delta in one transaction; returns rows updated. Needs an app context."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+            batch = {key: delta for key, delta in batch.items() if delta}
+            if not batch:
+                return 0
+            by_column = {}
+            for (post_id, column), delta in batch.items():
+                by_column.setdefault(column, []).append({'b_id': post_id, 'b_delta': delta})
+            try:
+                for column, params in by_column.items():
+                    _increment(column, params)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:        # keep them for the next attempt
+                    self._pending.update(batch)
+                raise
+            return len(batch)
+
+
+def _increment(column: str, params) -> None:
+    """Executemany ``UPDATE post SET column = column + :b_delta WHERE id = :b_id``."""
+    table = Post.__table__
+    col = table.c[column]
+    stmt = (db.update(table).where(table.c.id == db.bindparam('b_id'))
+            .values({col: db.func.coalesce(col, 0) + db.bindparam('b_delta')}))
+    db.session.execute(stmt, params)
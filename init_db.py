@@ -1,6 +1,4 @@
-from app import app, db
+from app import app, init_db
 
 with app.app_context():
-    print("Creating DB tables manually...")
-    db.create_all()
-    print("Done!")
+    init_db()
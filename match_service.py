@@ -0,0 +1,251 @@
+"""
+match_service.py
+────────────────
+Materialised AI match table (learner→mentor and mentor→learner).
+
+A background pass scores every user against the in-memory TF-IDF index
+(ai_engine.SkillMatcher) and stores each user's top-N as UserMatch rows.
+Profile edits refresh the edited user's list and re-score the lists of the
+counterparts it affects from one index, so /dashboard only ever reads a
+handful of pre-ranked rows by index. UserMatchState records that a list
+was computed, so an empty list is not recomputed on every read.
+
+The full pass is a deployment-wide job: run it in one process only, the
+worker (worker.py, ``docker-entrypoint.sh worker``), ``python
+match_service.py --loop``, or in-process when BACKGROUND_JOBS_IN_PROCESS=1
+(the single dev server).
+It only rewrites users whose list changed, in short batched transactions.
+
+Call from app.py inside an application context.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, User, UserMatch, UserMatchState
+
+logger = logging.getLogger(__name__)
+
+MATCH_TABLE_SIZE = 12
+# Counterparts whose lists are checked after a profile edit (highest similarity first).
+REFRESH_FANOUT = 200
+RECOMPUTE_INTERVAL_SECONDS = int(os.environ.get('MATCH_RECOMPUTE_INTERVAL', 900))
+RECOMPUTE_BATCH = 200       # users compared (and rewritten if changed) per transaction
+SCORE_TOLERANCE = 1e-6      # score changes below this do not count as a changed list
+
+
+def _insert():
+    return pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+# ─── Reads ────────────────────────────────────────────────────────────────────
+
+def get_ranked_matches(user_id: int, limit: int = MATCH_TABLE_SIZE) -> list:
+    """Return the precomputed UserMatch rows for ``user_id``, best first."""
+    return (UserMatch.query
+            .options(db.joinedload(UserMatch.match_user))
+            .filter_by(user_id=user_id)
+            .order_by(UserMatch.rank)
+            .limit(limit)
+            .all())
+
+
+def has_computed(user_id: int) -> bool:
+    """True once ``user_id``'s list has been computed, even if it came out empty."""
+    return db.session.get(UserMatchState, user_id) is not None
+
+
+# ─── Writes ───────────────────────────────────────────────────────────────────
+
+def _write_matches(user_id: int, ranked: list, now: datetime) -> None:
+    """Replace ``user_id``'s rows with ``ranked`` = [(match_id, score), ...]."""
+    UserMatch.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.add_all([
+        UserMatch(user_id=user_id, match_user_id=match_id, rank=rank, score=score, computed_at=now)
+        for rank, (match_id, score) in enumerate(ranked)
+    ])
+
+
+def _mark_computed(user_ids, now: datetime, touch: bool = True) -> None:
+    """Record that these users' lists are computed. ``touch=False`` leaves existing markers alone."""
+    if not user_ids:
+        return
+    stmt = _insert()(UserMatchState).values([{'user_id': uid, 'computed_at': now} for uid in user_ids])
+    if touch:
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id'], set_={'computed_at': now})
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['user_id'])
+    db.session.execute(stmt)
+
+
+def refresh_user_matches(matcher, user, commit: bool = True) -> list:
+    """Recompute and store ``user``'s own top-N list."""
+    now = datetime.utcnow()
+    ranked = matcher.top_matches(user, MATCH_TABLE_SIZE)
+    _write_matches(user.id, ranked, now)
+    _mark_computed([user.id], now)
+    if commit:
+        db.session.commit()
+    return ranked
+
+
+def refresh_after_profile_change(matcher, user) -> None:
+    """
+    Incrementally update the table after ``user``'s profile (or role) changed.
+
+    The user's own list is recomputed. For the counterparts most similar to
+    the user – plus anyone who already lists them – the stored list plus the
+    user is re-scored as a whole from this process's index, so no list ends
+    up mixing these scores with ones written by the worker from another fit.
+    Only a counterpart whose full list would lose the user needs a full
+    recompute, since their replacement is unknown. Anything outside the
+    fan-out is picked up by the next background pass.
+    """
+    now = datetime.utcnow()
+    _write_matches(user.id, matcher.top_matches(user, MATCH_TABLE_SIZE), now)
+    _mark_computed([user.id], now)
+
+    ids, sims = matcher.candidate_scores(user, exact=True)
+    nearest = set()
+    if len(ids):
+        nearest = {int(ids[i]) for i in sims.argsort()[::-1][:REFRESH_FANOUT]}
+
+    listing_ids = [row.user_id for row in
+                   UserMatch.query.with_entities(UserMatch.user_id).filter_by(match_user_id=user.id)]
+    affected = nearest | set(listing_ids)
+    if not affected:
+        db.session.commit()
+        return
+
+    stored = {}
+    for row in UserMatch.query.filter(UserMatch.user_id.in_(affected)).order_by(UserMatch.rank):
+        stored.setdefault(row.user_id, []).append((row.match_user_id, row.score))
+
+    valid_ids = set(int(i) for i in ids)
+    needs_full = []
+    lists = {}
+    for other_id in affected:
+        current = stored.get(other_id, [])
+        listed = [m for m, _ in current]
+        if other_id not in valid_ids:
+            # Roles no longer complement each other – drop the stale entry.
+            if user.id in listed:
+                needs_full.append(other_id)
+            continue
+        if other_id not in nearest:
+            # Listed but outside the fan-out: the user fell far down their ranking.
+            needs_full.append(other_id)
+            continue
+        lists[other_id] = listed + [user.id]
+
+    for other_id, ranked in matcher.rescore_lists(lists, MATCH_TABLE_SIZE).items():
+        current = stored.get(other_id, [])
+        listed = [m for m, _ in current]
+        if user.id in listed and len(current) == MATCH_TABLE_SIZE and \
+                ranked and ranked[-1][0] == user.id:
+            # The user sank to the bottom of a full list; someone unlisted may now beat them.
+            needs_full.append(other_id)
+        elif not _same_list(current, ranked):
+            _write_matches(other_id, ranked, now)
+
+    if needs_full:
+        for other in User.query.filter(User.id.in_(needs_full)).all():
+            refresh_user_matches(matcher, other, commit=False)
+    db.session.commit()
+
+
+def remove_user(user_id: int) -> None:
+    """Forget a deleted user and drop them from everyone else's lists."""
+    UserMatch.query.filter(
+        (UserMatch.user_id == user_id) | (UserMatch.match_user_id == user_id)
+    ).delete(synchronize_session=False)
+    UserMatchState.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _same_list(stored: list, ranked: list) -> bool:
+    return (len(stored) == len(ranked) and
+            all(m1 == m2 and abs((s1 or 0) - s2) <= SCORE_TOLERANCE
+                for (m1, s1), (m2, s2) in zip(stored, ranked)))
+
+
+def _apply_batch(batch: list, now: datetime) -> int:
+    """Rewrite the users in ``batch`` whose list changed, then commit. Returns users rewritten."""
+    ids = [user_id for user_id, _ in batch]
+    stored = {}
+    for user_id, match_id, score in (UserMatch.query
+                                     .with_entities(UserMatch.user_id, UserMatch.match_user_id, UserMatch.score)
+                                     .filter(UserMatch.user_id.in_(ids))
+                                     .order_by(UserMatch.user_id, UserMatch.rank)):
+        stored.setdefault(user_id, []).append((match_id, score))
+    changed = 0
+    for user_id, ranked in batch:
+        if not _same_list(stored.get(user_id, []), ranked):
+            _write_matches(user_id, ranked, now)
+            changed += 1
+    _mark_computed(ids, now, touch=False)
+    db.session.commit()
+    return changed
+
+
+def recompute_all(matcher, batch_size: int = RECOMPUTE_BATCH) -> int:
+    """Bring the table in line with the current index. Returns users whose list changed."""
+    now = datetime.utcnow()
+    changed = 0
+    batch = []
+    for item in matcher.iter_top_matches(MATCH_TABLE_SIZE):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            changed += _apply_batch(batch, now)
+            batch = []
+    if batch:
+        changed += _apply_batch(batch, now)
+    return changed
+
+
+# ─── Background recompute ─────────────────────────────────────────────────────
+
+def _recompute_loop(app, matcher, interval: int) -> None:
+    while True:
+        with app.app_context():
+            try:
+                started = time.time()
+                # Refit from the database so edits made by other workers/replicas land too.
+                matcher.build_index(User.query.all())
+                changed = recompute_all(matcher)
+                logger.info("Match table recomputed: %s users changed in %.1fs", changed, time.time() - started)
+            except Exception as exc:
+                db.session.rollback()
+                logger.error("Match recompute error: %s", exc)
+            finally:
+                db.session.remove()
+        time.sleep(interval)
+
+
+def start_background_recompute(app, matcher, interval: int = RECOMPUTE_INTERVAL_SECONDS) -> bool:
+    """Start the periodic recompute thread. ``interval <= 0`` disables it."""
+    if interval <= 0:
+        return False
+    thread = threading.Thread(target=_recompute_loop, args=(app, matcher, interval),
+                              name='match-recompute', daemon=True)
+    thread.start()
+    return True
+
+
+if __name__ == '__main__':
+    import sys
+    from ai_engine import SkillMatcher
+    from app import app
+
+    if '--loop' in sys.argv:
+        _recompute_loop(app, SkillMatcher(), max(RECOMPUTE_INTERVAL_SECONDS, 1))
+    with app.app_context():
+        matcher = SkillMatcher()
+        matcher.build_index(User.query.all())
+        print(f"Match table recomputed: {recompute_all(matcher)} users changed")
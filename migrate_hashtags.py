@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Add current directory to path so we can import local modules
+sys.path.append(os.getcwd())
+
+from app import app
+from models import db, PostHashtag, TagCounter
+import trending_service
+
+
+def migrate():
+    print("🚀 Starting Migration: Post.content hashtags -> PostHashtag + hourly TagCounter buckets")
+
+    with app.app_context():
+        # Create the new tables (PostHashtag, TagCounter)
+        db.create_all()
+
+        posts = trending_service.backfill()
+
+        print(f"✅ Posts indexed: {posts}")
+        print(f"   #️⃣ PostHashtag rows: {PostHashtag.query.count()}")
+        print(f"   🕒 TagCounter buckets: {TagCounter.query.count()}")
+
+    print("🏁 Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
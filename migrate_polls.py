@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Add current directory to path so we can import local modules
+sys.path.append(os.getcwd())
+
+from app import app
+from models import db, PollOption
+import poll_service
+
+
+def migrate():
+    print("🚀 Starting Migration: Poll.votes string -> PollOption counters")
+
+    with app.app_context():
+        # Create the new tables (PollOption, PollVote)
+        db.create_all()
+
+        polls = poll_service.backfill()
+
+        print(f"✅ Polls migrated: {polls}")
+        print(f"   🗳️ PollOption rows: {PollOption.query.count()}")
+
+    print("🏁 Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Add current directory to path so we can import local modules
+sys.path.append(os.getcwd())
+
+from app import app
+from models import db, Skill, UserSkill, UserGoal
+import skill_service
+
+
+def migrate():
+    print("🚀 Starting Migration: User.skills / User.goals text -> Skill dictionary + join tables")
+
+    with app.app_context():
+        # Create the new tables (Skill, SkillAlias, UserSkill, UserGoal)
+        db.create_all()
+
+        users = skill_service.backfill()
+
+        print(f"✅ Users processed: {users}")
+        print(f"   📚 Canonical skills: {Skill.query.count()}")
+        print(f"   🔗 UserSkill rows: {UserSkill.query.count()}, UserGoal rows: {UserGoal.query.count()}")
+
+    print("🏁 Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
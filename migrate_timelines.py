@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Add current directory to path so we can import local modules
+sys.path.append(os.getcwd())
+
+from app import app
+from models import db, TimelineEntry
+import timeline_service
+
+
+def migrate():
+    print("🚀 Starting Migration: connections timelines (TimelineEntry fan-out)")
+
+    with app.app_context():
+        # Create the new table (TimelineEntry)
+        db.create_all()
+
+        users = timeline_service.backfill()
+
+        print(f"✅ Users processed: {users}")
+        print(f"   📰 TimelineEntry rows: {TimelineEntry.query.count()}")
+
+    print("🏁 Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
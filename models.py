@@ -4,6 +4,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 db = SQLAlchemy()
+# The one database app.py and worker.py connect to (relative to the instance folder).
+DATABASE_URI = 'sqlite:///skillsync.db'
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,6 +31,11 @@ class User(UserMixin, db.Model):
     verification_status = db.Column(db.String(20), default='none') # none | pending | approved | rejected
     availability = db.Column(db.String(200), default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Accepted/completed peer connections; kept in step by app._transition_connection
+    # and repaired by reconcile_counters.py.
+    connection_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    # Unread Notification rows, kept by notification_service (see reconcile_counters)
+    unread_notification_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     # Relationships
     skill_progress = db.relationship('SkillProgress', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -70,13 +77,6 @@ class User(UserMixin, db.Model):
     def get_goals_list(self):
         return [g.strip() for g in self.goals.split(',') if g.strip()]
     
-    @property
-    def connection_count(self):
-        """Returns the number of accepted/completed peer connections."""
-        sent = [c for c in self.sent_connections if c.status in ('Accepted', 'Completed')]
-        received = [c for c in self.received_connections if c.status in ('Accepted', 'Completed')]
-        return len(sent) + len(received)
-
     def __repr__(self):
         return f'<User {self.name} ({self.email})>'
 
@@ -205,6 +205,11 @@ class Post(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     share_count = db.Column(db.Integer, default=0)
     views_count = db.Column(db.Integer, default=0)
+    # Denormalised child-row counts, kept in step by the like/comment/save/view
+    # routes (reconcile_counters.py repairs drift).
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    save_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     author = db.relationship('User', backref=db.backref('posts', lazy=True, cascade='all, delete-orphan'))
     poll = db.relationship('Poll', backref='post', uselist=False, cascade='all, delete-orphan')
@@ -213,6 +218,9 @@ class Post(db.Model):
     saves = db.relationship('PostSave', backref='post', lazy=True, cascade='all, delete-orphan')
     views = db.relationship('PostView', backref='post', lazy=True, cascade='all, delete-orphan')
 
+    # Keyset pagination of the home feed walks (created_at, id) newest first.
+    __table_args__ = (db.Index('ix_post_created_at_id', 'created_at', 'id'),)
+
 class Poll(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
@@ -224,6 +232,9 @@ class Poll(db.Model):
         return [o.strip() for o in self.options.split(';') if o.strip()]
 
     def get_votes_list(self):
+        # PollOption counters are authoritative; the string only for polls not yet migrated.
+        if self.option_rows:
+            return [o.vote_count for o in self.option_rows]
         if not self.votes:
             return [0] * len(self.get_options_list())
         return [int(v) for v in self.votes.split(';') if v.strip()]
@@ -231,6 +242,30 @@ class Poll(db.Model):
     def set_votes_list(self, votes_list):
         self.votes = ';'.join(map(str, votes_list))
 
+class PollOption(db.Model):
+    """Per-option vote counter, incremented atomically by poll_service."""
+    id = db.Column(db.Integer, primary_key=True)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    vote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (db.UniqueConstraint('poll_id', 'position', name='_poll_option_position_uc'),)
+
+    poll = db.relationship('Poll', backref=db.backref('option_rows', lazy=True, cascade='all, delete-orphan',
+                                                      order_by='PollOption.position'))
+
+class PollVote(db.Model):
+    """One user's vote on a poll; the unique constraint allows a single vote per user."""
+    id = db.Column(db.Integer, primary_key=True)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    option_index = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('poll_id', 'user_id', name='_poll_user_vote_uc'),)
+
+    poll = db.relationship('Poll', backref=db.backref('poll_votes', lazy=True, cascade='all, delete-orphan'))
+
 class PostLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
@@ -275,6 +310,45 @@ class PostComment(db.Model):
     
     author = db.relationship('User', backref=db.backref('comments', lazy=True))
 
+    # Comment pages seek on (post_id, id).
+    __table_args__ = (db.Index('ix_post_comment_post_id_id', 'post_id', 'id'),)
+
+class PostHashtag(db.Model):
+    """One row per distinct hashtag in a post, written when the post is created."""
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    tag = db.Column(db.String(100), nullable=False)     # lower-cased, with the leading '#'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('post_id', 'tag', name='_post_tag_uc'),
+                      db.Index('ix_post_hashtag_tag_post', 'tag', 'post_id'))
+
+    post = db.relationship('Post', backref=db.backref('hashtags', lazy=True, cascade='all, delete-orphan'))
+
+class TagCounter(db.Model):
+    """Posts / likes / views for one hashtag in one hour (see trending_service)."""
+    id = db.Column(db.Integer, primary_key=True)
+    tag = db.Column(db.String(100), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False, index=True)     # start of the UTC hour
+    posts = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('tag', 'bucket', name='_tag_bucket_uc'),)
+
+class TimelineEntry(db.Model):
+    """A post pushed into a reader's connections timeline (see timeline_service)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)      # reader
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)     # the post's created_at, for keyset paging
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='_timeline_user_post_uc'),
+                      db.Index('ix_timeline_user_created_post', 'user_id', 'created_at', 'post_id'))
+
+    user = db.relationship('User', backref=db.backref('timeline_entries', lazy=True, cascade='all, delete-orphan'))
+    post = db.relationship('Post', backref=db.backref('timeline_entries', lazy=True, cascade='all, delete-orphan'))
+
 class Meetup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -416,6 +490,9 @@ class CareerApplication(db.Model):
 
 
 
+# PeerConnection statuses that count towards User.connection_count.
+CONNECTED_STATUSES = ('Accepted', 'Completed')
+
 class PeerConnection(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -478,12 +555,27 @@ class Notification(db.Model):
     link = db.Column(db.String(255))
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # People (or, without an actor, events) merged into this row (a digest when > 1, see notification_service)
+    group_count = db.Column(db.Integer, nullable=False, default=1, server_default='1', index=True)
 
     user = db.relationship('User', backref=db.backref('notifications', lazy=True, cascade='all, delete-orphan'))
 
+    __table_args__ = (db.Index('ix_notification_user_type_created', 'user_id', 'type', 'created_at'),
+                      db.Index('ix_notification_user_read', 'user_id', 'is_read'))
+
     def __repr__(self):
         return f'<Notification {self.id} for User {self.user_id}>'
 
+class NotificationActor(db.Model):
+    """A person counted in a digest Notification, so repeat actions by them are not counted twice."""
+    notification_id = db.Column(db.Integer, db.ForeignKey('notification.id'), primary_key=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+
+    notification = db.relationship('Notification', backref=db.backref('actors', lazy=True,
+                                                                      cascade='all, delete-orphan'))
+    actor = db.relationship('User', backref=db.backref('notification_actions', lazy=True,
+                                                       cascade='all, delete-orphan'))
+
 class AIConversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -834,3 +926,86 @@ class MentorFeedback(db.Model):
 
     def __repr__(self):
         return f'<MentorFeedback mentor={self.mentor_id} student={self.student_id} rating={self.rating}>'
+
+
+# ─── AI Matches ────────────────────────────────────────────────────────────────
+
+class UserMatch(db.Model):
+    """Precomputed top-N AI match: learner→mentor or mentor→learner."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    match_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    rank = db.Column(db.Integer, nullable=False)          # 0 = best match
+    score = db.Column(db.Float, default=0.0)              # cosine similarity 0-1
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'rank', name='_user_match_rank_uc'),)
+
+    user = db.relationship('User', foreign_keys=[user_id],
+                           backref=db.backref('ai_matches', lazy=True, cascade='all, delete-orphan'))
+    match_user = db.relationship('User', foreign_keys=[match_user_id])
+
+    @property
+    def percentage(self):
+        return int((self.score or 0) * 100)
+
+    def __repr__(self):
+        return f'<UserMatch user={self.user_id} #{self.rank} -> {self.match_user_id}>'
+
+
+class UserMatchState(db.Model):
+    """Marks a user's UserMatch list as computed, so an empty list is not recomputed on read."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('match_state', uselist=False, cascade='all, delete-orphan'))
+
+
+# ─── Skill Dictionary ──────────────────────────────────────────────────────────
+
+class Skill(db.Model):
+    """Canonical skill. ``key`` is the normalised form (see skill_service.normalize_skill)."""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)      # display form
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    aliases = db.relationship('SkillAlias', backref='skill', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Skill {self.key}>'
+
+class SkillAlias(db.Model):
+    """Alternate spelling that resolves to a canonical Skill (e.g. "js" -> javascript)."""
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), nullable=False)
+
+    def __repr__(self):
+        return f'<SkillAlias {self.alias} -> {self.skill_id}>'
+
+class UserSkill(db.Model):
+    """Row per entry of User.skills, kept in sync by skill_service."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, default=0)           # order in the profile text
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'skill_id', name='_user_skill_uc'),)
+
+    user = db.relationship('User', backref=db.backref('skill_links', lazy=True, cascade='all, delete-orphan',
+                                                      order_by='UserSkill.position'))
+    skill = db.relationship('Skill')
+
+class UserGoal(db.Model):
+    """Row per entry of User.goals, kept in sync by skill_service."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, default=0)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'skill_id', name='_user_goal_uc'),)
+
+    user = db.relationship('User', backref=db.backref('goal_links', lazy=True, cascade='all, delete-orphan',
+                                                      order_by='UserGoal.position'))
+    skill = db.relationship('Skill')
@@ -0,0 +1,99 @@
+"""
+notification_push.py
+────────────────────
+Socket.IO delivery of notifications and events to the people they concern.
+
+On connect, every authenticated socket joins the room ``user:<id>``, so
+an emit to that room reaches all of the user's open tabs and no one else.
+Nothing is broadcast to every client.
+
+A push is queued on the SQLAlchemy session and sent only after the
+session commits. A notification that is rolled back is never announced.
+One made with ``create_notification(commit=False)`` goes out with the
+caller's commit.
+
+  • user_room(user_id)                   – room name
+  • push(user_id, event, payload)        – emit once the current transaction commits
+  • send(user_ids, event, payload)       – emit now (the caller has already committed)
+  • notification_payload(notif)          – JSON for the 'notification' event
+  • init_app(socketio)                   – join the user room on connect, hook session commits
+"""
+from __future__ import annotations
+import logging
+
+from flask_login import current_user
+from flask_socketio import join_room
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'socket_pushes'
+_socketio = None
+
+
+def user_room(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def push(user_id: int, event_name: str, payload: dict) -> None:
+    """Send ``event_name`` to ``user_id``'s sockets after the current transaction commits."""
+    if _socketio is None:
+        return
+    db.session.info.setdefault(_PENDING_KEY, []).append((user_room(user_id), event_name, payload))
+
+
+def send(user_ids, event_name: str, payload: dict) -> None:
+    """Emit ``event_name`` right away to each of ``user_ids``' rooms."""
+    if _socketio is None:
+        return
+    for user_id in dict.fromkeys(user_ids):
+        _socketio.emit(event_name, payload, to=user_room(user_id))
+
+
+def notification_payload(notif, unread_delta: int = 1) -> dict:
+    """``notif`` is a Notification or a row with its columns; digest updates pass ``unread_delta=0``."""
+    return {
+        'id': notif.id,
+        'title': notif.title,
+        'message': notif.message,
+        'type': notif.type,
+        'link': notif.link,
+        'created_at': notif.created_at.isoformat() if notif.created_at else None,
+        'count': notif.group_count or 1,
+        'unread_delta': unread_delta,
+    }
+
+
+# ─── Session hooks ────────────────────────────────────────────────────────────
+
+def _after_commit(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    for room, event_name, payload in pending or ():
+        try:
+            _socketio.emit(event_name, payload, to=room)
+        except Exception as exc:       # a push must never fail the request
+            logger.error("socket push %s to %s failed: %s", event_name, room, exc)
+
+
+def _after_transaction_end(session, transaction) -> None:
+    # Runs after _after_commit on success; anything left belongs to a rollback.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _on_connect(auth=None):
+    if current_user.is_authenticated:
+        join_room(user_room(current_user.id))
+
+
+def init_app(socketio) -> None:
+    global _socketio
+    if _socketio is not None:
+        return
+    _socketio = socketio
+    socketio.on_event('connect', _on_connect)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_transaction_end', _after_transaction_end)
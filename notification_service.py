@@ -0,0 +1,189 @@
+"""
+notification_service.py
+───────────────────────
+Notification writes: one, many, and bursts coalesced into digests.
+
+Every notification is written, and marked read, through here, in the
+caller's transaction. Each recipient's open tabs get a push
+(notification_push) once that transaction commits. The same transaction
+keeps User.unread_notification_count in step: inserts add to it,
+mark_read() subtracts, mark_all_read() zeroes it. reconcile_counters
+repairs any drift.
+
+Types listed in COALESCE_WINDOWS are merged. Suppose a user still has an
+unread notification of the same type and link from within the window. A
+new one then updates that row in place: group_count goes up, the message
+becomes the digest text, and created_at moves to now. No row is added.
+Eleven joins after "Bob joined your meeting" leave one row, "12 people
+joined your meeting". Items in one bulk call that share a
+(user, type, link) are merged before anything is written.
+
+group_count counts people, not events. Items carry an ``actor_id``, and
+NotificationActor records who a digest already counts. An unlike and
+re-like, or a second comment from the same person, refreshes the digest
+without raising its count. "{others}" in a digest renders as "1 other" or
+"N others".
+
+  • create(user_id, title, message, ...) – one notification (or digest update)
+  • create_bulk(items)                   – many: digest updates plus one multi-row INSERT
+  • mark_read(notif) / mark_all_read(user_id) – clear unread state and the counter
+  • COALESCE_WINDOWS                     – type -> merge window
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Notification, NotificationActor, User
+import notification_push
+
+COALESCE_WINDOWS = {
+    'like': timedelta(hours=1),
+    'comment': timedelta(hours=1),
+    'meeting': timedelta(hours=1),
+}
+INSERT_CHUNK = 500
+
+_RETURNING = (Notification.id, Notification.user_id, Notification.title, Notification.message,
+              Notification.type, Notification.link, Notification.created_at, Notification.group_count)
+
+
+def _insert():
+    return pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+def _digest_message(item, count: int) -> str:
+    """``item['digest']`` with ``{count}`` / ``{others}`` filled in, or the latest message with a tally."""
+    if count <= 1:
+        return item['message']
+    if item.get('digest'):
+        others = f"{count - 1} other" if count == 2 else f"{count - 1} others"
+        # Plain replace, not str.format: digests quote user text that may contain braces.
+        return item['digest'].replace('{count}', str(count)).replace('{others}', others)
+    return f"{item['message']} (+{count - 1} more)"
+
+
+def _add_actors(notification_id: int, actor_ids) -> int:
+    """Record ``actor_ids`` on a digest. Returns how many were not already counted."""
+    if not actor_ids:
+        return 0
+    added = db.session.execute(
+        _insert()(NotificationActor)
+        .values([{'notification_id': notification_id, 'actor_id': a} for a in actor_ids])
+        .on_conflict_do_nothing(index_elements=['notification_id', 'actor_id'])
+        .returning(NotificationActor.actor_id))
+    return len(added.all())
+
+
+def _merge(item, events: int, actor_ids, now):
+    """Fold a group into the user's open digest for this type/link. Returns the row, or None."""
+    link_match = Notification.link.is_(None) if item.get('link') is None else Notification.link == item['link']
+    target = (db.select(Notification.id)
+              .where(Notification.user_id == item['user_id'], Notification.type == item['type'], link_match,
+                     Notification.is_read == False, Notification.created_at >= now - COALESCE_WINDOWS[item['type']])
+              .order_by(Notification.created_at.desc()).limit(1).scalar_subquery())
+    touched = db.session.execute(
+        db.update(Notification).where(Notification.id == target)
+        .values(title=item['title'], created_at=now)
+        .returning(Notification.id, Notification.group_count)).first()
+    if touched is None:
+        return None
+    # Someone already in the digest (a re-like, a second comment) does not raise the count.
+    added = events + _add_actors(touched.id, actor_ids)
+    count = touched.group_count
+    if added:
+        count = db.session.execute(
+            db.update(Notification).where(Notification.id == touched.id)
+            .values(group_count=Notification.group_count + added)
+            .returning(Notification.group_count)).scalar_one()
+    return db.session.execute(
+        db.update(Notification).where(Notification.id == touched.id)
+        .values(message=_digest_message(item, count))
+        .returning(*_RETURNING)).first()
+
+
+def _bump_unread(deltas) -> None:
+    """Executemany ``unread_notification_count += delta`` for ``{user_id: delta}``."""
+    table = User.__table__
+    bumped = table.c.unread_notification_count + db.bindparam('b_delta')
+    stmt = (db.update(table).where(table.c.id == db.bindparam('b_id'))
+            .values({table.c.unread_notification_count: db.case((bumped < 0, 0), else_=bumped)}))
+    db.session.execute(stmt, [{'b_id': uid, 'b_delta': d} for uid, d in deltas.items() if d])
+
+
+def create_bulk(items) -> int:
+    """
+    Write notifications for dicts with ``user_id, title, message`` and
+    optional ``type`` (default 'system'), ``link``, ``digest`` and
+    ``actor_id`` (who did it). Does not commit. Returns how many rows were
+    inserted, not counting digest updates.
+    """
+    now = datetime.utcnow()
+    groups = {}                 # merge key -> [latest item, events without an actor, actor ids]
+    for n, item in enumerate(items):
+        item = {'type': 'system', 'link': None, 'actor_id': None, **item}
+        key = ((item['user_id'], item['type'], item['link']) if item['type'] in COALESCE_WINDOWS else n)
+        group = groups.setdefault(key, [item, 0, set()])
+        group[0] = item
+        if item['actor_id'] is None:
+            group[1] += 1
+        else:
+            group[2].add(item['actor_id'])
+
+    rows = []
+    new_actors = {}             # (user_id, type, link) of a new digest -> its actor ids
+    for item, events, actor_ids in groups.values():
+        if item['type'] in COALESCE_WINDOWS:
+            merged = _merge(item, events, actor_ids, now)
+            if merged is not None:
+                notification_push.push(merged.user_id, 'notification',
+                                       notification_push.notification_payload(merged, unread_delta=0))
+                continue
+            new_actors[(item['user_id'], item['type'], item['link'])] = actor_ids
+        count = events + len(actor_ids)
+        rows.append({'user_id': item['user_id'], 'title': item['title'],
+                     'message': _digest_message(item, count), 'type': item['type'], 'link': item['link'],
+                     'is_read': False, 'created_at': now, 'group_count': count})
+
+    for i in range(0, len(rows), INSERT_CHUNK):
+        inserted = db.session.execute(db.insert(Notification).values(rows[i:i + INSERT_CHUNK])
+                                      .returning(*_RETURNING))
+        actor_rows = []
+        for row in inserted:
+            notification_push.push(row.user_id, 'notification', notification_push.notification_payload(row))
+            # One new row per (user, type, link) in a call, so the key finds its actors.
+            for actor_id in new_actors.get((row.user_id, row.type, row.link), ()):
+                actor_rows.append({'notification_id': row.id, 'actor_id': actor_id})
+        if actor_rows:
+            db.session.execute(db.insert(NotificationActor).values(actor_rows))
+    if rows:
+        _bump_unread(Counter(row['user_id'] for row in rows))
+    return len(rows)
+
+
+def create(user_id: int, title: str, message: str, type: str = 'system', link: str = None,
+           digest: str = None, actor_id: int = None) -> int:
+    """Write one notification (see create_bulk). Does not commit."""
+    return create_bulk([{'user_id': user_id, 'title': title, 'message': message,
+                         'type': type, 'link': link, 'digest': digest, 'actor_id': actor_id}])
+
+
+def mark_read(notif) -> bool:
+    """Mark one notification read. False if it already was. Does not commit."""
+    changed = (Notification.query.filter_by(id=notif.id, is_read=False)
+               .update({Notification.is_read: True}, synchronize_session=False))
+    if changed:
+        _bump_unread({notif.user_id: -1})
+        notification_push.push(notif.user_id, 'unread_count', {'delta': -1})
+    return bool(changed)
+
+
+def mark_all_read(user_id: int) -> int:
+    """Mark all of ``user_id``'s notifications read and zero the counter. Does not commit."""
+    changed = (Notification.query.filter_by(user_id=user_id, is_read=False)
+               .update({Notification.is_read: True}, synchronize_session=False))
+    User.query.filter_by(id=user_id).update({User.unread_notification_count: 0}, synchronize_session=False)
+    notification_push.push(user_id, 'unread_count', {'count': 0})
+    return changed
@@ -0,0 +1,86 @@
+"""
+poll_service.py
+───────────────
+Poll voting on PollVote rows and PollOption counters.
+
+Each user has at most one PollVote per poll, enforced by a unique
+constraint. A vote is an INSERT ... ON CONFLICT DO NOTHING plus an atomic
+``vote_count = vote_count + 1`` on the chosen option, in one transaction.
+Concurrent votes therefore never overwrite each other the way the old
+read-modify-write of Poll.votes did. Changing a vote moves one count from
+the old option to the new one, conditional on the vote row still pointing
+at the old option.
+
+  • ensure_options(poll)                   – PollOption rows (seeded from the legacy string)
+  • cast_vote(poll, user_id, option_index) – 'voted' / 'changed' / 'unchanged'
+  • backfill()                             – migrate every poll (migrate_polls.py)
+"""
+from __future__ import annotations
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Poll, PollOption, PollVote
+
+
+def _insert():
+    return pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+def ensure_options(poll) -> None:
+    """Create the poll's PollOption rows if missing, carrying over legacy Poll.votes tallies."""
+    if poll.option_rows:
+        return
+    labels = poll.get_options_list()
+    legacy = poll.get_votes_list()
+    rows = [{'poll_id': poll.id, 'position': i, 'vote_count': legacy[i] if i < len(legacy) else 0}
+            for i in range(len(labels))]
+    if rows:
+        db.session.execute(_insert()(PollOption).values(rows)
+                           .on_conflict_do_nothing(index_elements=['poll_id', 'position']))
+    db.session.expire(poll, ['option_rows'])
+
+
+def _bump(poll_id, position, delta):
+    PollOption.query.filter_by(poll_id=poll_id, position=position).update(
+        {PollOption.vote_count: PollOption.vote_count + delta}, synchronize_session=False)
+
+
+def cast_vote(poll, user_id: int, option_index: int) -> str:
+    """Record ``user_id``'s vote and commit. Caller validates ``option_index``."""
+    ensure_options(poll)
+    inserted = db.session.execute(
+        _insert()(PollVote).values(poll_id=poll.id, user_id=user_id, option_index=option_index)
+        .on_conflict_do_nothing(index_elements=['poll_id', 'user_id'])).rowcount
+    if inserted:
+        _bump(poll.id, option_index, 1)
+        db.session.commit()
+        return 'voted'
+
+    previous = db.session.query(PollVote.option_index).filter_by(poll_id=poll.id, user_id=user_id).scalar()
+    if previous is None or previous == option_index:
+        db.session.commit()
+        return 'unchanged'
+    moved = (PollVote.query.filter_by(poll_id=poll.id, user_id=user_id, option_index=previous)
+             .update({PollVote.option_index: option_index}, synchronize_session=False))
+    if moved:
+        _bump(poll.id, previous, -1)
+        _bump(poll.id, option_index, 1)
+    db.session.commit()
+    return 'changed' if moved else 'unchanged'
+
+
+def backfill(batch_size: int = 500) -> int:
+    """Create PollOption rows for every poll that lacks them. Returns polls migrated."""
+    done = 0
+    last_id = 0
+    while True:
+        polls = (Poll.query.filter(Poll.id > last_id, ~Poll.option_rows.any())
+                 .order_by(Poll.id).limit(batch_size).all())
+        if not polls:
+            return done
+        for poll in polls:
+            ensure_options(poll)
+        db.session.commit()
+        done += len(polls)
+        last_id = polls[-1].id
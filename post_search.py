@@ -0,0 +1,167 @@
+"""
+post_search.py
+──────────────
+Full-text search over Post.content behind /api/search/posts.
+
+On SQLite with FTS5 the ``post_fts`` virtual table is an external-content
+index on ``post``. Insert, update and delete triggers keep it in step, so
+no application code has to remember to update it. Queries are ranked with
+bm25() and highlighted with snippet(). Databases without FTS5 fall back to
+a LIKE backend with the same interface. Hashtag terms are always matched
+exactly through PostHashtag (see trending_service), so ``#py`` never
+matches ``#python``.
+
+  • install(engine)           – pick a backend, creating the FTS table/triggers if possible
+  • search(q, limit, offset)  – [(post_id, snippet_html, score)] best first
+  • rebuild()                 – repopulate the FTS index from ``post``
+"""
+from __future__ import annotations
+import logging
+import os
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy.exc import OperationalError
+
+from models import db, Post
+import trending_service as trending_svc
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+SNIPPET_CHARS = 120
+
+
+def parse_query(q: str):
+    """``(words, hashtags)`` of a search string; hashtag words are kept in ``words``."""
+    hashtags = trending_svc.extract_hashtags(q)
+    words = [w.lower() for w in _WORD.findall(q or '')]
+    return list(dict.fromkeys(words)), hashtags
+
+
+def _highlight(marked: str) -> Markup:
+    """Escape user text, then turn the sentinel markers into <mark> tags."""
+    html = str(escape(marked))
+    return Markup(html.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+# ─── Backends ─────────────────────────────────────────────────────────────────
+
+class Fts5Backend:
+    name = 'fts5'
+
+    DDL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+        "content, content='post', content_rowid='id', tokenize='unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+        "INSERT INTO post_fts(rowid, content) VALUES (new.id, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+        "INSERT INTO post_fts(post_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF content ON post BEGIN "
+        "INSERT INTO post_fts(post_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+        "INSERT INTO post_fts(rowid, content) VALUES (new.id, new.content); END",
+    )
+
+    def install(self, engine) -> bool:
+        if engine.dialect.name != 'sqlite':
+            return False
+        try:
+            with engine.begin() as conn:
+                existed = conn.execute(db.text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_fts'")).first()
+                for ddl in self.DDL:
+                    conn.execute(db.text(ddl))
+                if not existed:
+                    conn.execute(db.text("INSERT INTO post_fts(post_fts) VALUES ('rebuild')"))
+        except OperationalError as exc:     # e.g. "no such module: fts5"
+            logger.warning("FTS5 unavailable, using LIKE post search: %s", exc)
+            return False
+        return True
+
+    def rebuild(self) -> None:
+        db.session.execute(db.text("INSERT INTO post_fts(post_fts) VALUES ('rebuild')"))
+        db.session.commit()
+
+    @staticmethod
+    def _match_expr(words):
+        # Quoted tokens are literal to FTS5; the last one is a prefix so results follow typing.
+        return ' '.join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+
+    def search(self, words, hashtags, limit, offset):
+        sql = ("SELECT post_fts.rowid, snippet(post_fts, 0, :mo, :mc, '…', :tokens), bm25(post_fts) "
+               "FROM post_fts WHERE post_fts MATCH :match")
+        params = {'match': self._match_expr(words), 'mo': _MARK_OPEN, 'mc': _MARK_CLOSE,
+                  'tokens': SNIPPET_TOKENS, 'limit': limit, 'offset': offset}
+        stmt = db.text(sql + (" AND post_fts.rowid IN (SELECT post_id FROM post_hashtag WHERE tag IN :tags)"
+                              if hashtags else "")
+                       + " ORDER BY bm25(post_fts), post_fts.rowid DESC LIMIT :limit OFFSET :offset")
+        if hashtags:
+            stmt = stmt.bindparams(db.bindparam('tags', expanding=True))
+            params['tags'] = hashtags
+        return [(pid, _highlight(snip), -score) for pid, snip, score in db.session.execute(stmt, params)]
+
+
+class LikeBackend:
+    """Portable fallback: every word as a LIKE filter, newest first, snippet built in Python."""
+    name = 'like'
+
+    def install(self, engine) -> bool:
+        return True
+
+    def rebuild(self) -> None:
+        pass
+
+    def search(self, words, hashtags, limit, offset):
+        q = db.session.query(Post.id, Post.content)
+        for word in words:
+            q = q.filter(Post.content.icontains(word, autoescape=True))
+        for tag in hashtags:
+            q = q.filter(Post.id.in_(trending_svc.tagged_post_ids(tag)))
+        rows = q.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).offset(offset).all()
+        return [(pid, self._snippet(content, words), None) for pid, content in rows]
+
+    @staticmethod
+    def _snippet(content, words):
+        content = content or ''
+        pattern = re.compile('|'.join(re.escape(w) for w in words), re.IGNORECASE)
+        first = pattern.search(content)
+        start = max((first.start() if first else 0) - SNIPPET_CHARS // 3, 0)
+        text = content[start:start + SNIPPET_CHARS]
+        marked = pattern.sub(lambda m: _MARK_OPEN + m.group(0) + _MARK_CLOSE, text)
+        return _highlight(('…' if start else '') + marked
+                          + ('…' if start + SNIPPET_CHARS < len(content) else ''))
+
+
+BACKENDS = {'fts5': Fts5Backend, 'like': LikeBackend}
+
+_backend = LikeBackend()
+
+
+def install(engine, preferred: str = None) -> str:
+    """Choose the search backend (POST_SEARCH_BACKEND overrides); returns its name."""
+    global _backend
+    preferred = preferred or os.environ.get('POST_SEARCH_BACKEND', 'fts5')
+    for name in dict.fromkeys([preferred, 'fts5', 'like']):
+        backend = BACKENDS[name]() if name in BACKENDS else None
+        if backend is not None and backend.install(engine):
+            _backend = backend
+            break
+    return _backend.name
+
+
+def backend_name() -> str:
+    return _backend.name
+
+
+def rebuild() -> None:
+    _backend.rebuild()
+
+
+def search(q: str, limit: int = 20, offset: int = 0) -> list:
+    """``[(post_id, snippet_html, score)]`` for ``q``, best match first (score None when unranked)."""
+    words, hashtags = parse_query(q)
+    if not words:
+        return []
+    return _backend.search(words, hashtags, limit, offset)
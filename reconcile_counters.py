@@ -0,0 +1,176 @@
+"""
+reconcile_counters.py
+─────────────────────
+Schema patch and repair job for the denormalised counter columns.
+
+The counters are updated in the same transaction as the rows they count,
+so they only drift after manual DB edits, deleted rows or crashes. This
+module recounts them from the source tables:
+
+  • ensure_counter_columns() – adds counter columns missing from an older
+    SQLite file (db.create_all() never alters existing tables)
+  • reconcile_all()          – recounts every counter, fixing only stale rows
+  • start_background_reconcile(app) – periodic repair thread
+
+Run standalone (e.g. from docker-entrypoint.sh):  python reconcile_counters.py
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+
+from models import (db, User, PeerConnection, CONNECTED_STATUSES, Post, PostLike, PostComment,
+                    PostSave, PostView, Notification)
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get('COUNTER_RECONCILE_INTERVAL', 3600))
+
+# table -> {column: SQLite column definition}
+COUNTER_COLUMNS = {
+    'user': {
+        'connection_count': 'INTEGER NOT NULL DEFAULT 0',
+        'unread_notification_count': 'INTEGER NOT NULL DEFAULT 0',
+    },
+    'post': {
+        'like_count': 'INTEGER NOT NULL DEFAULT 0',
+        'comment_count': 'INTEGER NOT NULL DEFAULT 0',
+        'save_count': 'INTEGER NOT NULL DEFAULT 0',
+    },
+    'notification': {'group_count': 'INTEGER NOT NULL DEFAULT 1'},
+}
+
+
+# ─── Schema ───────────────────────────────────────────────────────────────────
+
+def ensure_counter_columns() -> list:
+    """Add any missing counter column and create its index. Returns the columns added.
+
+    The indexes are declared on the models (``index=True``), so create_all
+    makes them on a fresh database; here they are created with checkfirst
+    for every counter column, added now or not, so a migrated file ends up
+    with the same indexes as a fresh one.
+    """
+    added = []
+    with db.engine.begin() as conn:
+        inspector = db.inspect(conn)
+        tables = set(inspector.get_table_names())
+        for table, columns in COUNTER_COLUMNS.items():
+            if table not in tables:
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            for column, ddl in columns.items():
+                if column in existing:
+                    continue
+                conn.execute(db.text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}'))
+                added.append(f'{table}.{column}')
+            for index in db.metadata.tables[table].indexes:
+                if any(c.name in columns for c in index.columns):
+                    index.create(conn, checkfirst=True)
+    if added:
+        logger.info("Added counter columns: %s", ', '.join(added))
+    return added
+
+
+# ─── Recounts ─────────────────────────────────────────────────────────────────
+
+def reconcile_connection_counts() -> int:
+    """Recount User.connection_count from PeerConnection. Returns users fixed."""
+    # One scan per side of the connection, grouped once, instead of an
+    # OR-correlated count per user that can use neither column's index.
+    connected = PeerConnection.status.in_(CONNECTED_STATUSES)
+    sides = db.union_all(
+        db.select(PeerConnection.sender_id.label('user_id')).where(connected),
+        db.select(PeerConnection.receiver_id.label('user_id')).where(connected),
+    ).subquery()
+    counts = (db.select(sides.c.user_id, db.func.count().label('n'))
+              .group_by(sides.c.user_id)
+              .subquery())
+    actual = db.func.coalesce(counts.c.n, 0)
+    stale = db.session.execute(
+        db.select(User.id, actual)
+        .outerjoin(counts, counts.c.user_id == User.id)
+        .where(User.connection_count != actual)
+    ).all()
+    if stale:
+        db.session.execute(db.update(User), [{'id': uid, 'connection_count': n} for uid, n in stale])
+    db.session.commit()
+    return len(stale)
+
+
+def reconcile_unread_notification_counts() -> int:
+    """Recount User.unread_notification_count from Notification. Returns users fixed."""
+    actual = (db.select(db.func.count(Notification.id))
+              .where(Notification.user_id == User.id, Notification.is_read == False)
+              .scalar_subquery())
+    result = db.session.execute(
+        db.update(User).where(User.unread_notification_count != actual)
+        .values(unread_notification_count=actual)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _reconcile_post_counter(column, child) -> int:
+    """Recount one Post counter column from its ``child`` table. Returns posts fixed."""
+    actual = (db.select(db.func.count(child.id))
+              .where(child.post_id == Post.id)
+              .scalar_subquery())
+    result = db.session.execute(
+        db.update(Post).where(db.func.coalesce(column, -1) != actual).values({column: actual})
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+RECONCILERS = {
+    'user.connection_count': reconcile_connection_counts,
+    'user.unread_notification_count': reconcile_unread_notification_counts,
+    'post.like_count': lambda: _reconcile_post_counter(Post.like_count, PostLike),
+    'post.comment_count': lambda: _reconcile_post_counter(Post.comment_count, PostComment),
+    'post.save_count': lambda: _reconcile_post_counter(Post.save_count, PostSave),
+    'post.views_count': lambda: _reconcile_post_counter(Post.views_count, PostView),
+}
+
+
+def reconcile_all() -> dict:
+    """Run every reconciler; returns {counter: rows fixed}."""
+    return {name: fn() for name, fn in RECONCILERS.items()}
+
+
+# ─── Background repair ────────────────────────────────────────────────────────
+
+def _reconcile_loop(app, interval: int) -> None:
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                fixed = {k: v for k, v in reconcile_all().items() if v}
+                if fixed:
+                    logger.warning("Counter drift repaired: %s", fixed)
+            except Exception as exc:
+                db.session.rollback()
+                logger.error("Counter reconcile error: %s", exc)
+            finally:
+                db.session.remove()
+
+
+def start_background_reconcile(app, interval: int = RECONCILE_INTERVAL_SECONDS) -> bool:
+    """Start the periodic reconcile thread. ``interval <= 0`` disables it."""
+    if interval <= 0:
+        return False
+    thread = threading.Thread(target=_reconcile_loop, args=(app, interval),
+                              name='counter-reconcile', daemon=True)
+    thread.start()
+    return True
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        ensure_counter_columns()
+        for name, fixed in reconcile_all().items():
+            print(f"{name}: {fixed} row(s) repaired")
@@ -0,0 +1,290 @@
+"""
+search_index.py
+───────────────
+In-process inverted index behind /api/search/users.
+
+Every distinct lower-cased profile value (each skill, each goal, the
+expertise and the job_role text) maps to the ids of the users holding it,
+and a trigram index over those values finds the ones that contain a query
+term. A search therefore resolves to a candidate id set without touching
+the users table; only the matching rows are loaded afterwards.
+
+SkillSuggestIndex does the same for /api/search/suggestions: a prefix
+trie over the distinct skill vocabulary, ranked by how many users list
+each skill.
+
+Both are built once at startup and kept current from the profile-write
+hooks in app.py.
+"""
+from __future__ import annotations
+import threading
+
+NGRAM = 3
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def profile_values(user) -> set:
+    """The lower-cased values a user can be found by."""
+    values = {s.lower() for s in user.get_skills_list()}
+    values.update(g.lower() for g in user.get_goals_list())
+    if user.expertise:
+        values.add(user.expertise.lower())
+    if user.job_role:
+        values.add(user.job_role.lower())
+    values.discard('')
+    return values
+
+
+class UserSearchIndex:
+    """value -> user ids, plus trigram -> values for substring lookups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}     # value -> {user_id}
+        self._grams = {}        # trigram -> {value}
+        self._values_of = {}    # user_id -> {value}
+
+    def __len__(self):
+        return len(self._values_of)
+
+    # ─── Maintenance ───
+
+    def build(self, users) -> None:
+        """Replace the whole index with ``users``."""
+        with self._lock:
+            self._postings, self._grams, self._values_of = {}, {}, {}
+            for user in users:
+                self._add(user.id, profile_values(user))
+
+    def update_user(self, user) -> None:
+        with self._lock:
+            self._remove(user.id)
+            self._add(user.id, profile_values(user))
+
+    def remove_user(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def _add(self, user_id, values):
+        self._values_of[user_id] = values
+        for value in values:
+            holders = self._postings.get(value)
+            if holders is None:
+                holders = self._postings[value] = set()
+                for gram in _ngrams(value):
+                    self._grams.setdefault(gram, set()).add(value)
+            holders.add(user_id)
+
+    def _remove(self, user_id):
+        for value in self._values_of.pop(user_id, ()):
+            holders = self._postings[value]
+            holders.discard(user_id)
+            if not holders:
+                del self._postings[value]
+                for gram in _ngrams(value):
+                    bucket = self._grams[gram]
+                    bucket.discard(value)
+                    if not bucket:
+                        del self._grams[gram]
+
+    # ─── Lookups ───
+
+    def _values_matching(self, term: str) -> set:
+        """Indexed values ``v`` with ``term in v`` or ``v in term``."""
+        found = set()
+        # v in term: v is one of term's substrings.
+        for i in range(len(term)):
+            for j in range(i + 1, len(term) + 1):
+                if term[i:j] in self._postings:
+                    found.add(term[i:j])
+        # term in v: intersect the trigram postings, then confirm.
+        if len(term) >= NGRAM:
+            buckets = sorted((self._grams.get(g, ()) for g in _ngrams(term)), key=len)
+            if not buckets[0]:
+                return found
+            candidates = set(buckets[0]).intersection(*buckets[1:])
+        else:
+            candidates = self._postings.keys()
+        found.update(v for v in candidates if term in v)
+        return found
+
+    def search(self, terms) -> set:
+        """Ids of users with any value that contains or is contained in any of ``terms``."""
+        ids = set()
+        with self._lock:
+            for term in {t.lower() for t in terms if t}:
+                for value in self._values_matching(term):
+                    ids |= self._postings[value]
+        return ids
+
+
+class _TrieNode:
+    __slots__ = ('children', 'term', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.term = None    # lower-cased term ending here
+        self.top = []       # best SUGGEST_CACHE terms in this subtree, most frequent first
+
+
+SUGGEST_CACHE = 10
+
+
+class SkillSuggestIndex:
+    """
+    Autocomplete over the distinct skill vocabulary.
+
+    A prefix trie whose nodes cache their most frequent terms answers
+    prefix queries by walking ``len(q)`` nodes. Terms containing ``q``
+    elsewhere come from the trigram index. Ranking is by how many users
+    list the skill. ``extra_terms`` (the SKILL_GRAPH keys) are always
+    suggestible, even when no user lists them.
+    """
+
+    def __init__(self, extra_terms=()):
+        self._lock = threading.Lock()
+        self._extra = {t.lower(): t for t in extra_terms}
+        self._reset()
+
+    def _reset(self):
+        self._root = _TrieNode()
+        self._count = {}        # term -> number of users listing it
+        self._spellings = {}    # term -> {display spelling: users}
+        self._grams = {}        # trigram -> {term}
+        self._skills_of = {}    # user_id -> [display spellings]
+        for term in self._extra:
+            self._insert(term, rerank=False)
+
+    # ─── Maintenance ───
+
+    def build(self, users) -> None:
+        with self._lock:
+            self._reset()
+            for user in users:
+                self._add(user.id, user.get_skills_list(), rerank=False)
+            self._rerank_subtree(self._root)
+
+    def update_user(self, user) -> None:
+        with self._lock:
+            self._remove(user.id)
+            self._add(user.id, user.get_skills_list())
+
+    def remove_user(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def _add(self, user_id, skills, rerank=True):
+        skills = list({s.lower(): s for s in skills}.values())
+        self._skills_of[user_id] = skills
+        for skill in skills:
+            term = skill.lower()
+            if term not in self._count:
+                self._insert(term, rerank=False)
+            spellings = self._spellings.setdefault(term, {})
+            spellings[skill] = spellings.get(skill, 0) + 1
+            self._count[term] = self._count.get(term, 0) + 1
+            if rerank:
+                self._rerank(term)
+
+    def _remove(self, user_id):
+        for skill in self._skills_of.pop(user_id, ()):
+            term = skill.lower()
+            spellings = self._spellings[term]
+            spellings[skill] -= 1
+            if not spellings[skill]:
+                del spellings[skill]
+            self._count[term] -= 1
+            if not self._count[term]:
+                del self._count[term], self._spellings[term]
+                if term not in self._extra:
+                    self._delete(term)
+                    continue
+            self._rerank(term)
+
+    def _path(self, term):
+        node, path = self._root, [self._root]
+        for ch in term:
+            node = node.children.setdefault(ch, _TrieNode())
+            path.append(node)
+        return path
+
+    def _insert(self, term, rerank=True):
+        self._path(term)[-1].term = term
+        for gram in _ngrams(term):
+            self._grams.setdefault(gram, set()).add(term)
+        if rerank:
+            self._rerank(term)
+
+    def _delete(self, term):
+        path = self._path(term)
+        path[-1].term = None
+        for gram in _ngrams(term):
+            self._grams[gram].discard(term)
+            if not self._grams[gram]:
+                del self._grams[gram]
+        # Prune empty leaves, then refresh the caches above them.
+        for depth in range(len(term), 0, -1):
+            node = path[depth]
+            if node.children or node.term is not None:
+                break
+            del path[depth - 1].children[term[depth - 1]]
+        self._rerank(term)
+
+    def _rank_key(self, term):
+        return (-self._count.get(term, 0), term)
+
+    def _rerank(self, term):
+        """Recompute the cached top terms on the trie path of ``term``, deepest first."""
+        node, path = self._root, [self._root]
+        for ch in term:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            path.append(node)
+        for node in reversed(path):
+            self._refresh_top(node)
+
+    def _refresh_top(self, node):
+        pool = {t for child in node.children.values() for t in child.top}
+        if node.term is not None:
+            pool.add(node.term)
+        node.top = sorted(pool, key=self._rank_key)[:SUGGEST_CACHE]
+
+    def _rerank_subtree(self, node):
+        for child in node.children.values():
+            self._rerank_subtree(child)
+        self._refresh_top(node)
+
+    # ─── Lookups ───
+
+    def _display(self, term):
+        spellings = self._spellings.get(term)
+        if spellings:
+            preferred = self._extra.get(term)
+            return max(spellings, key=lambda sp: (spellings[sp], sp == preferred, sp[:1].isupper(), sp))
+        return self._extra.get(term, term)
+
+    def suggest(self, q: str, limit: int = 8) -> list:
+        """Skills starting with ``q`` (most used first), then ones containing it."""
+        q = q.lower().strip()
+        if not q:
+            return []
+        with self._lock:
+            node = self._root
+            for ch in q:
+                node = node.children.get(ch)
+                if node is None:
+                    break
+            prefixed = list(node.top) if node is not None else []
+            if len(prefixed) < limit:
+                if len(q) >= NGRAM:
+                    buckets = [self._grams.get(g, set()) for g in _ngrams(q)]
+                    inner = set.intersection(*buckets)
+                else:
+                    inner = set(self._count) | set(self._extra)
+                inner = [t for t in inner if q in t and not t.startswith(q)]
+                prefixed += sorted(inner, key=self._rank_key)
+            return [self._display(t) for t in prefixed[:limit]]
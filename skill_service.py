@@ -0,0 +1,203 @@
+"""
+skill_service.py
+────────────────
+Canonical skill dictionary behind the UserSkill / UserGoal join tables.
+
+User.skills and User.goals (comma-separated text) remain the source of
+truth. A before_flush hook mirrors every change to them into UserSkill /
+UserGoal rows that point at canonical Skill ids. Case, whitespace and
+known aliases ("JS", "javascript ", "k8s") therefore collapse to one
+entry, and "who lists X" becomes an indexed join instead of a Python
+string scan.
+
+  • normalize_skill(text)           – "  Node.JS " -> "nodejs"
+  • resolve_skills(names)           – names -> Skill rows, creating new ones
+  • sync_user_links(user)           – rewrite a user's join rows from the text columns
+  • users_with_skills_filter(names) – SQL criterion for User queries
+  • backfill()                      – one-time population (migrate_skills.py)
+"""
+from __future__ import annotations
+import re
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, User, Skill, SkillAlias, UserSkill, UserGoal
+
+# Alternate spelling -> canonical key. Seeded into SkillAlias by backfill();
+# further aliases can be added as SkillAlias rows.
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "node": "nodejs",
+    "node.js": "nodejs",
+    "node js": "nodejs",
+    "reactjs": "react",
+    "react.js": "react",
+    "next.js": "nextjs",
+    "vue.js": "vue",
+    "vuejs": "vue",
+    "golang": "go",
+    "py": "python",
+    "python3": "python",
+    "k8s": "kubernetes",
+    "postgres": "postgresql",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai/ml": "machine learning",
+    "springboot": "spring boot",
+    "ux/ui": "ui/ux",
+    "ci cd": "ci/cd",
+    "amazon web services": "aws",
+    "google cloud": "gcp",
+    "data structures and algorithms": "dsa",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_skill(text: str) -> str:
+    """Lower-case, trim and collapse whitespace, then apply the static aliases."""
+    key = _WHITESPACE.sub(" ", (text or "").strip().lower())
+    return SKILL_ALIASES.get(key, key)
+
+
+def split_skills(text: str) -> list:
+    """``(key, display)`` per distinct canonical entry of a comma-separated field, in order."""
+    seen = {}
+    for part in (text or "").split(","):
+        display = _WHITESPACE.sub(" ", part.strip())
+        key = normalize_skill(display)
+        if key and key not in seen:
+            seen[key] = display
+    return list(seen.items())
+
+
+# ─── Dictionary ───────────────────────────────────────────────────────────────
+
+def _insert(session):
+    return pg_insert if session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+def _lookup(session, keys) -> dict:
+    """Existing Skill for each of ``keys`` that has one, directly or through a SkillAlias."""
+    aliased = dict(session.query(SkillAlias.alias, SkillAlias.skill_id)
+                   .filter(SkillAlias.alias.in_(keys)).all())
+    rows = session.query(Skill).filter(
+        Skill.key.in_(keys) | Skill.id.in_(set(aliased.values()))
+    ).all()
+    by_key = {s.key: s for s in rows}
+    by_id = {s.id: s for s in rows}
+    found = {}
+    for key in keys:
+        skill = by_id.get(aliased[key]) if key in aliased else by_key.get(key)
+        if skill is not None:
+            found[key] = skill
+    return found
+
+
+def resolve_skills(pairs, session=None) -> dict:
+    """Map each ``(key, display)`` pair's key to its Skill, creating missing ones."""
+    session = session or db.session
+    keys = {key for key, _ in pairs}
+    if not keys:
+        return {}
+
+    found = _lookup(session, keys)
+    missing = {key: display or key for key, display in pairs if key not in found}
+    if missing:
+        # Two requests may introduce the same new skill at once. INSERT ... ON
+        # CONFLICT DO NOTHING lets the loser keep the winner's row instead of
+        # failing the flush on Skill.key's unique constraint; both re-select.
+        now = datetime.utcnow()
+        session.execute(_insert(session)(Skill.__table__)
+                        .values([{'key': key, 'name': name, 'created_at': now} for key, name in missing.items()])
+                        .on_conflict_do_nothing(index_elements=['key']))
+        found.update(_lookup(session, set(missing)))
+    return found
+
+
+def sync_user_links(user, session=None) -> None:
+    """Rewrite ``user``'s UserSkill / UserGoal rows to match the text columns."""
+    session = session or db.session
+    for text, attr, link_cls in ((user.skills, "skill_links", UserSkill),
+                                 (user.goals, "goal_links", UserGoal)):
+        pairs = split_skills(text)
+        skills = resolve_skills(pairs, session)
+        existing = {link.skill_id: link for link in getattr(user, attr) if link.skill_id is not None}
+        links = []
+        for position, (key, _) in enumerate(pairs):
+            skill = skills[key]
+            link = existing.pop(skill.id, None) if skill.id is not None else None
+            if link is None:
+                link = link_cls(skill=skill)
+            link.position = position
+            links.append(link)
+        # delete-orphan removes the links that were not kept.
+        setattr(user, attr, links)
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_links_before_flush(session, flush_context, instances):
+    """Keep the join tables in step with every User insert or skills/goals edit."""
+    changed = [obj for obj in session.new if isinstance(obj, User)]
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = db.inspect(obj)
+            if state.attrs.skills.history.has_changes() or state.attrs.goals.history.has_changes():
+                changed.append(obj)
+    if not changed:
+        return
+    with session.no_autoflush:
+        for user in changed:
+            sync_user_links(user, session)
+
+
+# ─── Queries ──────────────────────────────────────────────────────────────────
+
+def skill_ids_select(names):
+    """SELECT of the canonical Skill ids for ``names`` (aliases resolved)."""
+    keys = {normalize_skill(n) for n in names} - {""}
+    return (db.select(Skill.id).where(Skill.key.in_(keys))
+            .union(db.select(SkillAlias.skill_id).where(SkillAlias.alias.in_(keys))))
+
+
+def users_with_skills_filter(names, goals=False):
+    """Criterion matching users who list any of ``names`` as a skill (or goal)."""
+    link = UserGoal if goals else UserSkill
+    return User.id.in_(db.select(link.user_id).where(link.skill_id.in_(skill_ids_select(names))))
+
+
+# ─── Backfill ─────────────────────────────────────────────────────────────────
+
+def seed_aliases() -> int:
+    """Store SKILL_ALIASES as SkillAlias rows. Returns aliases added."""
+    existing = {a for (a,) in db.session.query(SkillAlias.alias)}
+    targets = resolve_skills([(key, key) for key in set(SKILL_ALIASES.values())])
+    added = 0
+    for alias, key in SKILL_ALIASES.items():
+        if alias not in existing:
+            db.session.add(SkillAlias(alias=alias, skill=targets[key]))
+            added += 1
+    db.session.commit()
+    return added
+
+
+def backfill(batch_size: int = 500) -> int:
+    """Build UserSkill / UserGoal rows for every user. Safe to re-run."""
+    seed_aliases()
+    done = 0
+    last_id = 0
+    while True:
+        users = (User.query.filter(User.id > last_id)
+                 .order_by(User.id).limit(batch_size).all())
+        if not users:
+            return done
+        for user in users:
+            sync_user_links(user)
+        db.session.commit()
+        done += len(users)
+        last_id = users[-1].id
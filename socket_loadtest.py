@@ -0,0 +1,108 @@
+"""
+socket_loadtest.py
+──────────────────
+Delivery-latency load test for Socket.IO pushes across workers and replicas.
+
+Each account opens --tabs sockets, every one logged in with its own HTTP
+session, so behind a sticky ingress the tabs spread over pods. Each round,
+a separate session per account POSTs /api/notifications/mark-all-read.
+That pushes 'unread_count' to the account's user:<id> room, and the script
+times how long every tab takes to receive it. Without a shared
+SOCKETIO_MESSAGE_QUEUE, tabs held by another pod than the one serving the
+POST never get the event, and they show up as "missed".
+
+    python socket_loadtest.py --base-url http://skillsync.local --tabs 20 --rounds 50 \\
+        --account alex@example.com:learner123 --account sarah@skillsync.com:mentor123:mentor
+
+Needs ``python-socketio[client]`` (websocket-client for the websocket transport).
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+import socketio
+
+
+def _login(base_url, email, password, role):
+    http = requests.Session()
+    r = http.post(f"{base_url}/login", data={'email': email, 'password': password, 'login_role': role},
+                  allow_redirects=False, timeout=10)
+    if r.status_code != 302 or 'login' in r.headers.get('Location', ''):
+        raise SystemExit(f"login failed for {email}")
+    return http
+
+
+class Tab:
+    """One browser tab: a logged-in socket that stamps each 'unread_count' it receives."""
+
+    def __init__(self, base_url, account, transports):
+        self.received = threading.Event()
+        self.received_at = None
+        self.client = socketio.Client(http_session=_login(base_url, *account), reconnection=False)
+        self.client.on('unread_count', self._on_unread)
+        self.client.connect(base_url, transports=transports, wait_timeout=10)
+
+    def _on_unread(self, data):
+        self.received_at = time.perf_counter()
+        self.received.set()
+
+    def reset(self):
+        self.received.clear()
+        self.received_at = None
+
+
+def run(args):
+    accounts = []
+    for spec in args.account:
+        email, password, *role = spec.split(':')
+        accounts.append((email, password, role[0] if role else 'student'))
+    transports = ['websocket'] if args.websocket_only else ['polling', 'websocket']
+
+    tabs = {acct: [Tab(args.base_url, acct, transports) for _ in range(args.tabs)] for acct in accounts}
+    senders = {acct: _login(args.base_url, *acct) for acct in accounts}
+    print(f"{sum(len(t) for t in tabs.values())} sockets connected for {len(accounts)} account(s)")
+    time.sleep(1)
+
+    latencies, missed = [], 0
+    for _ in range(args.rounds):
+        for acct, acct_tabs in tabs.items():
+            for tab in acct_tabs:
+                tab.reset()
+            sent_at = time.perf_counter()
+            senders[acct].post(f"{args.base_url}/api/notifications/mark-all-read", timeout=10)
+            deadline = sent_at + args.timeout
+            for tab in acct_tabs:
+                if tab.received.wait(max(deadline - time.perf_counter(), 0)):
+                    latencies.append((tab.received_at - sent_at) * 1000)
+                else:
+                    missed += 1
+        time.sleep(args.interval)
+
+    for acct_tabs in tabs.values():
+        for tab in acct_tabs:
+            tab.client.disconnect()
+
+    expected = args.rounds * sum(len(t) for t in tabs.values())
+    print(f"delivered {len(latencies)}/{expected}, missed {missed}")
+    if latencies:
+        latencies.sort()
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        print(f"latency ms: p50 {statistics.median(latencies):.1f}  p95 {p95:.1f}  max {latencies[-1]:.1f}")
+    return 1 if missed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5005')
+    parser.add_argument('--account', action='append',
+                        help='email:password[:role]; repeat for several accounts')
+    parser.add_argument('--tabs', type=int, default=10, help='sockets per account')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.2, help='seconds between rounds')
+    parser.add_argument('--timeout', type=float, default=5.0, help='seconds before a tab counts as missed')
+    parser.add_argument('--websocket-only', action='store_true')
+    args = parser.parse_args()
+    args.account = args.account or ['alex@example.com:learner123']
+    raise SystemExit(run(args))
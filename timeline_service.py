@@ -0,0 +1,180 @@
+"""
+timeline_service.py
+───────────────────
+Per-user "from my connections" timelines, fan-out on write.
+
+When a post is created, its id is pushed into a bounded TimelineEntry list
+for the author and for each of their connections. Reading the connections
+feed is then a keyset scan of the reader's own list plus a single IN
+query to hydrate the posts, with no join across PeerConnection and Post.
+
+A timeline is trimmed back to TIMELINE_MAX only once it has grown
+TRIM_SLACK entries past it, so a reader's trim runs once every TRIM_SLACK
+posts, not on each one. Pages read newest first and never see the slack.
+
+Authors with more than FANOUT_MAX_CONNECTIONS connections are not fanned
+out, since one post would mean that many inserts. Their posts are pulled
+at read time and merged into the page.
+
+  • fan_out(post)            – push a new post (call before commit)
+  • link(a, b) / unlink(a, b) – connection accepted / ended (call before commit)
+  • page(user_id, position)  – post ids for one page, newest first, and the next position
+  • backfill()               – build timelines for existing data (migrate_timelines.py)
+"""
+from __future__ import annotations
+import os
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, User, Post, PeerConnection, TimelineEntry, CONNECTED_STATUSES
+
+TIMELINE_MAX = int(os.environ.get('TIMELINE_MAX', 500))                  # entries kept per reader
+TRIM_SLACK = int(os.environ.get('TIMELINE_TRIM_SLACK', 50))              # growth allowed before a trim
+FANOUT_MAX_CONNECTIONS = int(os.environ.get('TIMELINE_FANOUT_MAX', 1000))
+LINK_BACKFILL = 20      # recent posts copied each way when two users connect
+
+
+def _insert():
+    return pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+
+
+def connected_ids_select(user_id):
+    """SELECT of the ids of ``user_id``'s connections."""
+    other = db.case((PeerConnection.sender_id == user_id, PeerConnection.receiver_id),
+                    else_=PeerConnection.sender_id)
+    return (db.select(other)
+            .where((PeerConnection.sender_id == user_id) | (PeerConnection.receiver_id == user_id),
+                   PeerConnection.status.in_(CONNECTED_STATUSES)))
+
+
+def _push(readers_select, posts_select) -> None:
+    """INSERT every (reader, post) pair, ignoring ones already present."""
+    readers = readers_select.subquery()
+    posts = posts_select.subquery()
+    pairs = db.select(readers.c[0], posts.c.id, posts.c.created_at).select_from(readers.join(posts, db.true()))
+    db.session.execute(_insert()(TimelineEntry)
+                       .from_select(['user_id', 'post_id', 'created_at'], pairs)
+                       .on_conflict_do_nothing(index_elements=['user_id', 'post_id']))
+
+
+def _trim(readers_select) -> None:
+    """Cut the given readers' timelines that exceed TIMELINE_MAX + TRIM_SLACK back to TIMELINE_MAX."""
+    # Index-only count per reader; the window below runs only for the few over the limit.
+    over = [uid for (uid,) in db.session.execute(
+        db.select(TimelineEntry.user_id)
+        .where(TimelineEntry.user_id.in_(readers_select))
+        .group_by(TimelineEntry.user_id)
+        .having(db.func.count() > TIMELINE_MAX + TRIM_SLACK))]
+    if not over:
+        return
+    ranked = (db.select(TimelineEntry.id,
+                        db.func.row_number().over(
+                            partition_by=TimelineEntry.user_id,
+                            order_by=(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())).label('rn'))
+              .where(TimelineEntry.user_id.in_(over))
+              .subquery())
+    db.session.execute(db.delete(TimelineEntry).where(
+        TimelineEntry.id.in_(db.select(ranked.c.id).where(ranked.c.rn > TIMELINE_MAX))))
+
+
+def _pushes(author) -> bool:
+    return (author.connection_count or 0) <= FANOUT_MAX_CONNECTIONS
+
+
+# ─── Writes ───────────────────────────────────────────────────────────────────
+
+def fan_out(post) -> bool:
+    """Push ``post`` to its author's and their connections' timelines. False for pull-mode authors."""
+    if post.id is None:
+        db.session.flush()
+    author = post.author or db.session.get(User, post.user_id)
+    if not _pushes(author):
+        return False
+    readers = connected_ids_select(author.id).union(db.select(db.literal(author.id)))
+    _push(readers, db.select(Post.id, Post.created_at).where(Post.id == post.id))
+    _trim(readers)
+    return True
+
+
+def _recent_posts(author_id):
+    return (db.select(Post.id, Post.created_at).where(Post.user_id == author_id)
+            .order_by(Post.created_at.desc(), Post.id.desc()).limit(LINK_BACKFILL))
+
+
+def link(a_id: int, b_id: int) -> None:
+    """Two users just connected: copy each one's recent posts into the other's timeline."""
+    users = {u.id: u for u in User.query.filter(User.id.in_((a_id, b_id)))}
+    for reader, author in ((a_id, b_id), (b_id, a_id)):
+        if author in users and _pushes(users[author]):
+            _push(db.select(db.literal(reader)), _recent_posts(author))
+    _trim(db.select(User.id).where(User.id.in_((a_id, b_id))))
+
+
+def unlink(a_id: int, b_id: int) -> None:
+    """Two users are no longer connected: drop each one's posts from the other's timeline."""
+    for reader, author in ((a_id, b_id), (b_id, a_id)):
+        db.session.execute(db.delete(TimelineEntry).where(
+            TimelineEntry.user_id == reader,
+            TimelineEntry.post_id.in_(db.select(Post.id).where(Post.user_id == author))))
+
+
+# ─── Reads ────────────────────────────────────────────────────────────────────
+
+def _before(created_col, id_col, position):
+    created_at, post_id = position
+    return (created_col < created_at) | ((created_col == created_at) & (id_col < post_id))
+
+
+def page(user_id: int, position=None, limit: int = 20) -> tuple:
+    """
+    ``(post_ids, next_position)`` for one page of ``user_id``'s connections
+    timeline, newest first, strictly after keyset ``position``
+    (``(created_at, post_id)``). ``next_position`` is None on the last page.
+    """
+    pushed = (db.select(TimelineEntry.post_id, TimelineEntry.created_at)
+              .where(TimelineEntry.user_id == user_id))
+    if position:
+        pushed = pushed.where(_before(TimelineEntry.created_at, TimelineEntry.post_id, position))
+    rows = db.session.execute(pushed.order_by(TimelineEntry.created_at.desc(),
+                                              TimelineEntry.post_id.desc()).limit(limit + 1)).all()
+
+    followed = connected_ids_select(user_id).union(db.select(db.literal(user_id)))
+    pull_authors = [uid for (uid,) in db.session.execute(
+        db.select(User.id).where(User.id.in_(followed),
+                                 User.connection_count > FANOUT_MAX_CONNECTIONS))]
+    if pull_authors:
+        pulled = db.select(Post.id, Post.created_at).where(Post.user_id.in_(pull_authors))
+        if position:
+            pulled = pulled.where(_before(Post.created_at, Post.id, position))
+        rows += db.session.execute(pulled.order_by(Post.created_at.desc(), Post.id.desc())
+                                   .limit(limit + 1)).all()
+        rows = sorted(set(rows), key=lambda r: (r[1], r[0]), reverse=True)
+
+    rows = rows[:limit + 1]
+    next_position = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return [post_id for post_id, _ in rows[:limit]], next_position
+
+
+# ─── Backfill ─────────────────────────────────────────────────────────────────
+
+def backfill(batch_size: int = 200) -> int:
+    """Fill every user's timeline from current connections and posts. Safe to re-run."""
+    done = 0
+    last_id = 0
+    while True:
+        ids = [uid for (uid,) in db.session.execute(
+            db.select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size))]
+        if not ids:
+            return done
+        for uid in ids:
+            followed = connected_ids_select(uid).union(db.select(db.literal(uid)))
+            authors = (db.select(User.id)
+                       .where(User.id.in_(followed),
+                              User.connection_count <= FANOUT_MAX_CONNECTIONS))
+            recent = (db.select(Post.id, Post.created_at).where(Post.user_id.in_(authors))
+                      .order_by(Post.created_at.desc(), Post.id.desc()).limit(TIMELINE_MAX))
+            _push(db.select(db.literal(uid)), recent)
+        db.session.commit()
+        done += len(ids)
+        last_id = ids[-1]
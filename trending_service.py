@@ -0,0 +1,236 @@
+"""
+trending_service.py
+───────────────────
+Incremental hashtag trending.
+
+Hashtags are extracted once, when a post is created, into PostHashtag.
+Every post, like and view then bumps an hourly TagCounter bucket for each
+of the post's tags, in the same transaction as the write itself. Trending
+is a top-K over the buckets inside the chosen window. Each bucket is
+weighted by
+
+    (posts * 1.0 + likes * 0.5 + views * 0.1) * 0.5 ** (age_hours / half_life)
+
+so recent activity outranks older activity of the same size.
+
+  • extract_hashtags(text)           – "#Python and #python #ML" -> ['#ml', '#python']
+  • index_post(post)                 – PostHashtag rows + post counter (call before commit)
+  • record_engagement(post_id, ...)  – like / view deltas for the post's tags
+  • record_views_bulk({post_id: n})  – batched views (view_buffer flushes)
+  • trending(window, limit)          – ranked tags for '24h', '7d' or 'month'
+  • backfill()                       – one-time population (migrate_hashtags.py)
+"""
+from __future__ import annotations
+from collections import defaultdict
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Post, PostHashtag, PostLike, PostView, TagCounter
+
+HASHTAG_RE = re.compile(r'#\w+')
+MAX_TAG_LENGTH = 100
+
+WEIGHTS = {'posts': 1.0, 'likes': 0.5, 'views': 0.1}
+
+# window -> (span, decay half-life in hours)
+WINDOWS = {
+    '24h': (timedelta(hours=24), 6),
+    '7d': (timedelta(days=7), 24),
+    'month': (timedelta(days=30), 72),
+}
+DEFAULT_WINDOW = os.environ.get('TRENDING_WINDOW', 'month')
+CACHE_SECONDS = int(os.environ.get('TRENDING_CACHE_SECONDS', 60))
+
+_cache_lock = threading.Lock()
+_cache = {}     # window -> (expires_at, ranked list)
+
+
+def normalize_tag(text: str) -> str:
+    """'Python' / '#PYTHON ' -> '#python'."""
+    tag = (text or '').strip().lower()
+    if tag and not tag.startswith('#'):
+        tag = '#' + tag
+    return tag[:MAX_TAG_LENGTH]
+
+
+def extract_hashtags(text: str) -> list:
+    """Distinct lower-cased hashtags in ``text``, sorted."""
+    return sorted({normalize_tag(t) for t in HASHTAG_RE.findall(text or '')})
+
+
+def hour_bucket(when: datetime) -> datetime:
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def resolve_window(window) -> str:
+    return window if window in WINDOWS else DEFAULT_WINDOW
+
+
+# ─── Writes ───────────────────────────────────────────────────────────────────
+
+def _bump(tags, when, posts=0, likes=0, views=0) -> None:
+    """Upsert ``+= delta`` into the hourly bucket of ``when`` for every tag."""
+    if not tags or not (posts or likes or views):
+        return
+    bucket = hour_bucket(when)
+    _upsert([{'tag': tag, 'bucket': bucket, 'posts': posts, 'likes': likes, 'views': views}
+             for tag in tags])
+
+
+def _upsert(rows) -> None:
+    """Add each row's posts / likes / views to its (tag, bucket) counter."""
+    insert = pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(TagCounter).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['tag', 'bucket'],
+        set_={col: getattr(TagCounter, col) + getattr(stmt.excluded, col)
+              for col in WEIGHTS},
+    )
+    db.session.execute(stmt)
+
+
+def index_post(post) -> list:
+    """Store ``post``'s hashtags and count it towards their trend. Returns the tags."""
+    if post.id is None:
+        db.session.flush()
+    created = post.created_at or datetime.utcnow()
+    tags = extract_hashtags(post.content)
+    for tag in tags:
+        db.session.add(PostHashtag(post_id=post.id, tag=tag, created_at=created))
+    _bump(tags, created, posts=1)
+    return tags
+
+
+def record_engagement(post_id: int, likes: int = 0, views: int = 0) -> None:
+    """Add like / view deltas (negative for an unlike) to the post's tags, this hour."""
+    if not (likes or views):
+        return
+    tags = [t for (t,) in db.session.query(PostHashtag.tag).filter_by(post_id=post_id)]
+    _bump(tags, datetime.utcnow(), likes=likes, views=views)
+
+
+def record_views_bulk(views_by_post: dict) -> None:
+    """``record_engagement`` for many posts at once: ``{post_id: new views}``."""
+    if not views_by_post:
+        return
+    per_tag = defaultdict(int)
+    rows = (db.session.query(PostHashtag.post_id, PostHashtag.tag)
+            .filter(PostHashtag.post_id.in_(list(views_by_post))))
+    for post_id, tag in rows:
+        per_tag[tag] += views_by_post[post_id]
+    if per_tag:
+        bucket = hour_bucket(datetime.utcnow())
+        _upsert([{'tag': tag, 'bucket': bucket, 'posts': 0, 'likes': 0, 'views': n}
+                 for tag, n in per_tag.items()])
+
+
+# ─── Reads ────────────────────────────────────────────────────────────────────
+
+def _rank(window: str, now: datetime) -> list:
+    span, half_life = WINDOWS[window]
+    rows = (db.session.query(TagCounter.tag, TagCounter.bucket, TagCounter.posts,
+                             TagCounter.likes, TagCounter.views)
+            .filter(TagCounter.bucket >= hour_bucket(now - span))
+            .all())
+    stats = {}
+    for tag, bucket, posts, likes, views in rows:
+        age_hours = max((now - bucket).total_seconds() / 3600.0, 0.0)
+        decay = 0.5 ** (age_hours / half_life)
+        s = stats.get(tag)
+        if s is None:
+            s = stats[tag] = {'tag': tag, 'score': 0.0, 'count': 0, 'likes': 0, 'views': 0}
+        s['score'] += (posts * WEIGHTS['posts'] + likes * WEIGHTS['likes']
+                       + views * WEIGHTS['views']) * decay
+        s['count'] += posts
+        s['likes'] += likes
+        s['views'] += views
+    return [s for s in stats.values() if s['count'] > 0]
+
+
+def trending(window=None, limit: int = 5, now: datetime = None) -> list:
+    """
+    Top ``limit`` tags as dicts (tag, score, count, likes, views), best
+    first. ``count`` / ``likes`` / ``views`` are undecayed window totals.
+    """
+    window = resolve_window(window)
+    if now is None and CACHE_SECONDS > 0:
+        with _cache_lock:
+            hit = _cache.get(window)
+            if hit and hit[0] > time.monotonic():
+                return [dict(s) for s in hit[1][:limit]]
+    ranked = sorted(_rank(window, now or datetime.utcnow()),
+                    key=lambda s: (-s['score'], s['tag']))
+    if now is None and CACHE_SECONDS > 0:
+        with _cache_lock:
+            _cache[window] = (time.monotonic() + CACHE_SECONDS, ranked)
+    return [dict(s) for s in ranked[:limit]]
+
+
+def recent_posts_by_tag(tags, window=None, per_tag: int = 10) -> dict:
+    """``{tag: [Post, ...]}``, newest first, at most ``per_tag`` posts per tag in the window."""
+    if not tags:
+        return {}
+    since = datetime.utcnow() - WINDOWS[resolve_window(window)][0]
+    ranked = (db.select(PostHashtag.tag, PostHashtag.post_id,
+                        db.func.row_number().over(partition_by=PostHashtag.tag,
+                                                  order_by=PostHashtag.post_id.desc()).label('rn'))
+              .where(PostHashtag.tag.in_(tags), PostHashtag.created_at >= since)
+              .subquery())
+    rows = (db.session.query(ranked.c.tag, Post)
+            .join(Post, Post.id == ranked.c.post_id)
+            .filter(ranked.c.rn <= per_tag)
+            .options(db.joinedload(Post.author))
+            .order_by(ranked.c.tag, ranked.c.rn)
+            .all())
+    by_tag = {tag: [] for tag in tags}
+    for tag, post in rows:
+        by_tag[tag].append(post)
+    return by_tag
+
+
+def tagged_post_ids(tag):
+    """SELECT of the ids of posts carrying ``tag`` (for feed filtering)."""
+    return db.select(PostHashtag.post_id).where(PostHashtag.tag == normalize_tag(tag))
+
+
+# ─── Backfill ─────────────────────────────────────────────────────────────────
+
+def backfill(batch_size: int = 500) -> int:
+    """Index posts that have no PostHashtag rows yet and rebuild TagCounter. Returns posts indexed."""
+    done = 0
+    last_id = 0
+    while True:
+        posts = (Post.query.filter(Post.id > last_id, ~Post.hashtags.any())
+                 .order_by(Post.id).limit(batch_size).all())
+        if not posts:
+            break
+        for post in posts:
+            for tag in extract_hashtags(post.content):
+                db.session.add(PostHashtag(post_id=post.id, tag=tag,
+                                           created_at=post.created_at or datetime.utcnow()))
+        db.session.commit()
+        done += len(posts)
+        last_id = posts[-1].id
+
+    # Counters are derived data: recount them from the source rows.
+    totals = defaultdict(lambda: {'posts': 0, 'likes': 0, 'views': 0})
+    now = datetime.utcnow()
+    for tag, created in db.session.query(PostHashtag.tag, PostHashtag.created_at):
+        totals[tag, hour_bucket(created or now)]['posts'] += 1
+    for model, field in ((PostLike, 'likes'), (PostView, 'views')):
+        rows = (db.session.query(PostHashtag.tag, model.created_at)
+                .join(model, model.post_id == PostHashtag.post_id))
+        for tag, created in rows:
+            totals[tag, hour_bucket(created or now)][field] += 1
+    db.session.query(TagCounter).delete()
+    rows = [dict(tag=tag, bucket=bucket, **counts) for (tag, bucket), counts in totals.items()]
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(TagCounter), rows[i:i + batch_size])
+    db.session.commit()
+    return done
@@ -0,0 +1,165 @@
+"""
+view_buffer.py
+──────────────
+Write-behind buffer for post impressions (/api/post/view/<id>).
+
+The feed reports a view for every card that scrolls into sight. Writing
+each one synchronously (lookup, insert, commit) would queue every request
+behind SQLite's single writer. Instead, views are collected in memory,
+deduplicated per (post_id, user_id), and written in bulk by a background
+flusher. The flusher uses INSERT ... ON CONFLICT DO NOTHING against
+PostView's unique constraint. Only the rows that were actually inserted
+bump Post.views_count and the hashtag view counters, in the same
+transaction.
+
+  • ViewBuffer.record(post_id, user_id) – queue a view; False if already seen
+  • ViewBuffer.note_stored(user_id, ids) – mark views already in PostView as seen
+  • ViewBuffer.pending_for(post_id)     – queued views not yet in views_count
+  • ViewBuffer.flush()                  – write everything queued (app context)
+  • start_background_flush(app, buffer) – flusher thread + flush at exit
+"""
+from __future__ import annotations
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Post, PostView
+import trending_service as trending_svc
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+MAX_PENDING = 5000          # flush early once this many views are queued
+RECENT_SIZE = 100000        # flushed or already-stored pairs remembered for deduplication
+INSERT_CHUNK = 500
+
+
+class ViewBuffer:
+    def __init__(self, max_pending=MAX_PENDING, recent_size=RECENT_SIZE):
+        self.max_pending = max_pending
+        self.recent_size = recent_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}              # (post_id, user_id) -> first seen (utc)
+        self._flushing = {}             # the batch being written, until it is committed
+        self._per_post = Counter()      # post_id -> queued views
+        self._recent = OrderedDict()    # recently flushed pairs, oldest first
+        self.wakeup = threading.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, post_id: int, user_id: int) -> bool:
+        """Queue a view. Returns False if this user's view is already queued, being written or stored."""
+        key = (post_id, user_id)
+        with self._lock:
+            if key in self._pending or key in self._flushing or key in self._recent:
+                return False
+            self._pending[key] = datetime.utcnow()
+            self._per_post[post_id] += 1
+            if len(self._pending) >= self.max_pending:
+                self.wakeup.set()
+        return True
+
+    def note_stored(self, user_id: int, post_ids) -> None:
+        """Remember views already in PostView (e.g. a feed page's viewed_ids) so record() skips them."""
+        with self._lock:
+            for post_id in post_ids:
+                self._recent[(post_id, user_id)] = None
+                self._recent.move_to_end((post_id, user_id))
+            self._trim_recent()
+
+    def _trim_recent(self) -> None:
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+
+    def pending_for(self, post_id: int) -> int:
+        with self._lock:
+            return self._per_post.get(post_id, 0)
+
+    def flush(self) -> int:
+        """Write queued views; returns how many were new. Needs an app context."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            if not batch:
+                return 0
+            try:
+                inserted = self._write(batch)
+            except Exception:
+                db.session.rollback()
+                with self._lock:        # keep them for the next attempt
+                    self._flushing = {}
+                    for key, seen in batch.items():
+                        self._pending.setdefault(key, seen)
+                raise
+            with self._lock:
+                self._flushing = {}
+                for key in batch:
+                    post_id = key[0]
+                    self._per_post[post_id] -= 1
+                    if self._per_post[post_id] <= 0:
+                        del self._per_post[post_id]
+                    self._recent[key] = None
+                self._trim_recent()
+            return sum(inserted.values())
+
+    @staticmethod
+    def _write(batch) -> Counter:
+        insert = pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+        rows = [{'post_id': p, 'user_id': u, 'created_at': seen} for (p, u), seen in batch.items()]
+        inserted = Counter()
+        for i in range(0, len(rows), INSERT_CHUNK):
+            stmt = (insert(PostView).values(rows[i:i + INSERT_CHUNK])
+                    .on_conflict_do_nothing(index_elements=['post_id', 'user_id'])
+                    .returning(PostView.post_id))
+            inserted.update(post_id for (post_id,) in db.session.execute(stmt))
+        for post_id, n in inserted.items():
+            Post.query.filter_by(id=post_id).update(
+                {Post.views_count: db.func.coalesce(Post.views_count, 0) + n}, synchronize_session=False)
+        trending_svc.record_views_bulk(inserted)
+        db.session.commit()
+        return inserted
+
+
+# ─── Background flusher ───────────────────────────────────────────────────────
+
+def _flush_in_context(app, buffer) -> None:
+    with app.app_context():
+        try:
+            buffer.flush()
+        except Exception as exc:
+            logger.error("%s flush error: %s", type(buffer).__name__, exc)
+        finally:
+            db.session.remove()
+
+
+def _flush_loop(app, buffer, interval) -> None:
+    while True:
+        buffer.wakeup.wait(interval)
+        buffer.wakeup.clear()
+        _flush_in_context(app, buffer)
+
+
+def start_background_flush(app, buffer, interval: float = FLUSH_INTERVAL_SECONDS,
+                           name: str = 'view-flush') -> bool:
+    """Start the flusher thread and flush once more at interpreter exit.
+
+    Works for any buffer with ``flush()`` and a ``wakeup`` event (see
+    engagement_buffer.CounterBuffer). ``interval <= 0`` disables the
+    thread; callers then flush explicitly.
+    """
+    atexit.register(_flush_in_context, app, buffer)
+    if interval <= 0:
+        return False
+    thread = threading.Thread(target=_flush_loop, args=(app, buffer, interval),
+                              name=name, daemon=True)
+    thread.start()
+    return True
@@ -0,0 +1,123 @@
+"""
+viewer_state.py
+───────────────
+"Liked / saved / viewed by me" for a page of feed cards.
+
+lookup() issues at most one query per interaction table for all visible
+post ids, and the cards get plain sets. Walking post.likes / post.saves
+per card loaded every row of those collections.
+
+ViewerBlooms is an optional per-user Bloom filter over the post ids a user
+has liked or saved. A page where no post can be liked (the usual case)
+then skips the query entirely, and otherwise only the "maybe" ids are
+checked. The filters live in process memory and are rebuilt after
+BLOOM_TTL_SECONDS. With several worker processes, a like made through
+another worker can go unseen until then. Enable with FEED_BLOOM_FILTER=1.
+"""
+from __future__ import annotations
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from models import db, PostLike, PostSave, PostView
+
+# kind -> model with (post_id, user_id)
+KINDS = {'liked': PostLike, 'saved': PostSave, 'viewed': PostView}
+BLOOM_KINDS = ('liked', 'saved')
+
+BLOOM_TTL_SECONDS = 300
+BLOOM_MAX_USERS = 5000
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integers (double hashing on one blake2b digest)."""
+
+    __slots__ = ('size', 'hashes', 'bits', 'capacity', 'count')
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(capacity, 64)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def _positions(self, value: int):
+        digest = hashlib.blake2b(value.to_bytes(8, 'little', signed=True), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: int) -> None:
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class ViewerBlooms:
+    """(user_id, kind) -> BloomFilter of post ids, LRU-bounded and TTL-refreshed."""
+
+    def __init__(self, ttl=BLOOM_TTL_SECONDS, max_users=BLOOM_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._filters = OrderedDict()   # (user_id, kind) -> (expires_at, BloomFilter)
+
+    def _load(self, user_id, kind):
+        model = KINDS[kind]
+        post_ids = [pid for (pid,) in db.session.query(model.post_id).filter(model.user_id == user_id)]
+        bloom = BloomFilter(len(post_ids) * 2)
+        for pid in post_ids:
+            bloom.add(pid)
+        return bloom
+
+    def get(self, user_id: int, kind: str) -> BloomFilter:
+        key = (user_id, kind)
+        with self._lock:
+            entry = self._filters.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._filters.move_to_end(key)
+                return entry[1]
+        bloom = self._load(user_id, kind)
+        with self._lock:
+            self._filters[key] = (time.monotonic() + self.ttl, bloom)
+            self._filters.move_to_end(key)
+            while len(self._filters) > self.max_users * len(BLOOM_KINDS):
+                self._filters.popitem(last=False)
+        return bloom
+
+    def note(self, user_id: int, kind: str, post_id: int) -> None:
+        """Record a new like / save. A filter that is over capacity is dropped and rebuilt on next use."""
+        key = (user_id, kind)
+        with self._lock:
+            entry = self._filters.get(key)
+            if entry is None:
+                return
+            bloom = entry[1]
+            if bloom.count >= bloom.capacity:
+                del self._filters[key]
+            else:
+                bloom.add(post_id)
+
+
+def lookup(user_id: int, post_ids, blooms: ViewerBlooms = None) -> dict:
+    """``{'liked_ids': set, 'saved_ids': set, 'viewed_ids': set}`` restricted to ``post_ids``."""
+    post_ids = list(post_ids)
+    state = {}
+    for kind, model in KINDS.items():
+        candidates = post_ids
+        if blooms is not None and kind in BLOOM_KINDS and candidates:
+            bloom = blooms.get(user_id, kind)
+            candidates = [pid for pid in candidates if pid in bloom]
+        found = set()
+        if candidates:
+            found = {pid for (pid,) in db.session.query(model.post_id)
+                     .filter(model.user_id == user_id, model.post_id.in_(candidates))}
+        state[f'{kind}_ids'] = found
+    return state
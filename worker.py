@@ -0,0 +1,64 @@
+"""
+worker.py
+─────────
+Periodic maintenance jobs, run in their own process next to the web server.
+
+The web container serves with a single eventlet gunicorn worker, where a
+background thread is a green thread. The match recompute (refit and
+NumPy scoring over every user) and the counter reconcilers (full-table
+UPDATE ... SELECT count(*)) never yield while they run, so inside that
+worker they would stall every request and socket on the pod. Here they
+run on real threads in a process that serves nothing.
+
+The worker does not import app.py. It builds a bare Flask app bound to
+the same database, so it neither touches the schema nor fits the web
+process's search and suggestion indexes. The database must already be
+initialized (init_db.py): in deployment.yaml the initContainer does that
+before this sidecar and the web container start.
+
+    docker-entrypoint.sh worker      # the sidecar container in deployment.yaml
+    python worker.py                 # locally, after init_db.py
+
+  • match recompute   – match_service, every MATCH_RECOMPUTE_INTERVAL seconds
+  • counter reconcile – reconcile_counters, every COUNTER_RECONCILE_INTERVAL seconds
+
+The view and engagement flushers stay in the web process: they drain
+buffers held in its memory, in one short batched transaction per tick.
+``python app.py`` runs everything in one process (BACKGROUND_JOBS_IN_PROCESS=1).
+"""
+import time
+
+from dotenv import load_dotenv
+from flask import Flask
+
+from ai_engine import SkillMatcher
+from models import db, DATABASE_URI
+import match_service as match_svc
+import reconcile_counters
+
+
+def create_app() -> Flask:
+    """Flask app with only the database configured (same instance folder as app.py)."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def main() -> int:
+    load_dotenv()
+    app = create_app()
+    started = [match_svc.start_background_recompute(app, SkillMatcher()),
+               reconcile_counters.start_background_reconcile(app)]
+    if not any(started):
+        print("worker: every job is disabled (interval <= 0), exiting")
+        return 0
+    print("worker: match recompute %s, counter reconcile %s"
+          % tuple('on' if s else 'off' for s in started))
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())